@@ -1,12 +1,30 @@
+import argparse
 import os
+import shutil
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from flask import Flask, request, render_template, redirect, url_for
-import io
-import base64
+from flask import Flask, request, render_template, redirect, url_for, jsonify
+import json
+import tarfile
+import tempfile
+import time
+import uuid
+import zipfile
 from werkzeug.utils import secure_filename
-from search import detect_patterns
+from archive import iter_upload_members, save_member
+from diagnostics import diagnose_recoveries
+from quality import validate_series, detect_segments, detect_stream_segments, has_issues
+from stream import iter_csv_stream, SeriesSummary
+import render
+from render import plot_intervals, render_thumbnail
+import metrics
+from ingest import load_series, file_digest, stream_digest
+from cache import ResultCache, SeriesStore
+from jobs import JobQueue, QueueFullError
+from config import (RESULT_CACHE_MAX_ITEMS, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL,
+                    JOB_WORKERS, JOB_MAX_PENDING, JOB_MAX_FINISHED, JOB_STATE_DIR, JOB_STATE_TTL,
+                    TABLE_PAGE_SIZE, TABLE_MAX_PAGE_SIZE,
+                    BATCH_MAX_FILES, BATCH_MAX_KEPT, BATCH_STATE_DIR, BATCH_MAX_MEMBER_BYTES, BATCH_MAX_TOTAL_BYTES)
 
 # Инициализация Flask-приложения
 app = Flask(__name__)
@@ -16,125 +34,447 @@ app.config['UPLOAD_FOLDER'] = 'uploads'
 if not os.path.exists(app.config['UPLOAD_FOLDER']):
     os.makedirs(app.config['UPLOAD_FOLDER'])
 
+# Кэш результатов: ключ — хэш содержимого файла и параметры обнаружения
+result_cache = ResultCache(RESULT_CACHE_MAX_ITEMS, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL)
+# Ряды результатов для постраничной таблицы хранятся на диске, отдельно от кэша
+series_store = SeriesStore()
+DETECT_PARAMS = {}
+
+# Очередь фоновых задач анализа: обработчик запроса не ждет обнаружения и построения графика.
+# Состояние и результаты задач записываются на диск, поэтому их видят все процессы веб-сервера
+job_queue = JobQueue(JOB_WORKERS, JOB_MAX_PENDING, JOB_MAX_FINISHED, state_dir=JOB_STATE_DIR,
+                     state_ttl=JOB_STATE_TTL)
+
+# Пакеты из нескольких файлов: по JSON-файлу со сведениями о скважинах на пакет
+os.makedirs(BATCH_STATE_DIR, exist_ok=True)
+
 def load_data(file_path):
     """
-    Загружает данные из CSV-файла и переименовывает колонки.
-    """
-    data = pd.read_csv(file_path)
-    data.columns = ["Время (часы)", "Давление (атм)"]
-    return data
-
-def plot_intervals(data, recovery_intervals, drop_intervals, derivative):
-    """
-    Строит график с интервалами КВД, КПД и областями.
-    """
-    fig, ax1 = plt.subplots(figsize=(12, 6))
-
-    # Добавляем производную в DataFrame
-    data["Производная (атм/час)"] = derivative
-
-    # Построение давления на первой оси
-    ax1.plot(data["Время (часы)"], data["Давление (атм)"], label="Давление", color='blue')
-    ax1.set_xlabel("Время (часы)")
-    ax1.set_ylabel("Давление (атм)", color='blue')
-    ax1.tick_params(axis='y', labelcolor='blue')
-
-    # Создание второй оси для производной
-    ax2 = ax1.twinx()
-    ax2.plot(data["Время (часы)"], derivative, label="Производная давления", color='red', linestyle='--')
-    ax2.set_ylabel("Производная (атм/час)", color='red')
-    ax2.tick_params(axis='y', labelcolor='red')
-
-    # Цвета для интервалов
-    recovery_colors = ['green', 'blue', 'orange']
-    drop_colors = ['red', 'purple', 'yellow']
-
-    # Отображение интервалов КВД
-    for idx, interval in enumerate(recovery_intervals):
-        color = recovery_colors[idx % len(recovery_colors)]
-        plt.axvspan(interval[0], interval[1], color=color, alpha=0.3, label=f"КВД {idx+1}" if idx < 3 else "")
-        # Подпись для КВД
-        plt.text((interval[0] + interval[1]) / 2, max(data["Давление (атм)"]), "КВД",
-                 color=color, fontsize=12, ha='center', va='bottom')
-
-    # Отображение интервалов КПД
-    for idx, interval in enumerate(drop_intervals):
-        color = drop_colors[idx % len(drop_colors)]
-        plt.axvspan(interval[0], interval[1], color=color, alpha=0.3, label=f"КПД {idx+1}" if idx < 3 else "")
-        # Подпись для КПД
-        plt.text((interval[0] + interval[1]) / 2, min(data["Давление (атм)"]), "КПД",
-                 color=color, fontsize=12, ha='center', va='top')
-
-    # Определение и выделение областей
-    time = data["Время (часы)"].values
-    pressure = data["Давление (атм)"].values
-
-    # Область 1: Влияние ствола скважины (ВСС)
-    wb_start = 0
-    wb_end = time[np.argmax(derivative > 1)]  # Примерный конец области ВСС
-    plt.axvspan(wb_start, wb_end, color='gray', alpha=0.2, label="Влияние ствола скважины (ВСС)")
-
-    # Область 2: Работа пласта
-    ra_start = wb_end
-    ra_end = time[np.argmax(derivative < 0.5)]  # Примерный конец области работы пласта
-    plt.axvspan(ra_start, ra_end, color='yellow', alpha=0.2, label="Работа пласта")
-
-    # Область 3: Влияние границ
-    pc_start = ra_end
-    pc_end = time[-1]  # Конец графика
-    plt.axvspan(pc_start, pc_end, color='pink', alpha=0.2, label="Влияние границ")
-
-    # Настройка шкалы на оси X (время)
-    plt.xticks(np.arange(0, max(data["Время (часы)"]) + 1, 1))  # Шаг 1 час
-
-    # Настройка графика
-    plt.title("Выделение интервалов КВД, КПД и областей на графике")
-    plt.legend(loc='upper left', bbox_to_anchor=(1, 1), fontsize='small', ncol=1)
-    plt.grid()
-
-    img = io.BytesIO()
-    plt.savefig(img, format='png', bbox_inches='tight')
-    plt.close()
-    img.seek(0)
-    plot_url = base64.b64encode(img.getvalue()).decode()
-
-    # Возвращаем обновленный DataFrame с производной
-    return plot_url, data.to_dict('records')
+    Загружает ряд скважины из CSV-файла (через бинарный кэш) в виде WellSeries.
+    """
+    with metrics.stage("app.read_csv"):
+        return load_series(file_path)
+
+def result_key(digest, params=DETECT_PARAMS):
+    return f"{digest}:{json.dumps(params, sort_keys=True)}"
+
+def run_analysis(digest, file_path, params=DETECT_PARAMS, thumbnail=False):
+    """
+    Полный анализ файла: загрузка, проверка и исправление ряда, обнаружение интервалов
+    на каждом непрерывном участке, диагностика КВД и построение графика
+    (при thumbnail=True — и миниатюры для сводки пакета).
+    Выполняется в процессе пула задач; замеры этапов возвращаются вместе с результатом.
+    Ряды (время, давление, производная) записываются в series_store, а результат
+    содержит только число точек, поэтому он мал и не зависит от длины ряда.
+    """
+    with metrics.capture() as records:
+        data = load_data(file_path)
+        with metrics.stage("app.validate", len(data)):
+            data, segments, quality = validate_series(data, params.get("window_size", 10))
+        with metrics.stage("app.detect_patterns", len(data)):
+            recovery_intervals, drop_intervals, derivative = detect_segments(data, segments, **params)
+        with metrics.stage("app.diagnostics", len(data)):
+            diagnostics = diagnose_recoveries(data, recovery_intervals)
+        time = data.time
+        pressure = data.pressure
+        with metrics.stage("app.save_series", len(data)):
+            series_store.save(result_key(digest, params), time, pressure, derivative)
+        with metrics.stage("app.plot_intervals", len(data)):
+            # График и миниатюра строятся одновременно в пуле потоков построения
+            plot_future = render.submit(plot_intervals, data, recovery_intervals, drop_intervals, derivative,
+                                        diagnostics)
+            thumb_future = (render.submit(render_thumbnail, time, pressure, recovery_intervals, drop_intervals)
+                            if thumbnail else None)
+            plot_url = plot_future.result()
+            thumb_url = thumb_future.result() if thumb_future is not None else None
+    return {
+        "metrics": records,
+        "digest": digest,
+        "recovery": recovery_intervals,
+        "drop": drop_intervals,
+        "diagnostics": diagnostics,
+        "quality": quality,
+        "points": len(time),
+        "plot_url": plot_url,
+        "thumb_url": thumb_url,
+    }
+
+def submit_analysis(digest, file_path, params=DETECT_PARAMS, thumbnail=False, reserved=False):
+    """
+    Ставит анализ файла в очередь; по завершении результат попадает в кэш.
+    """
+    key = result_key(digest, params)
+
+    def store(result):
+        metrics.merge(result.pop("metrics", None))
+        size = len(result["plot_url"]) + len(result["thumb_url"] or "") + 64 * (len(result["recovery"]) + len(result["drop"]))
+        result_cache.put(key, result, size)
+
+    return job_queue.submit(run_analysis, digest, file_path, params, thumbnail,
+                            on_done=store, reserved=reserved)
+
+def accept_job(job_id):
+    """
+    Ответ на постановку задачи: JSON-клиентам — идентификатор задачи (202),
+    браузеру — перенаправление на страницу ожидания результата.
+    """
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(job_id=job_id, status_url=url_for('job_status', job_id=job_id),
+                       result_url=url_for('job_result', job_id=job_id)), 202
+    return redirect(url_for('job_result', job_id=job_id), code=303)
+
+def render_result(result):
+    """
+    Отображает страницу результатов по результату анализа.
+    Таблица данных загружается постранично через /api/series.
+    """
+    with metrics.stage("app.template_render"):
+        return render_template('result.html', plot_url=result["plot_url"], recovery=result["recovery"],
+                               drop=result["drop"], diagnostics=result["diagnostics"],
+                               quality=result["quality"] if has_issues(result["quality"]) else None,
+                               series_url=url_for('api_series', digest=result["digest"]), total=result["points"], page_size=TABLE_PAGE_SIZE)
+
+def well_summary(result):
+    """
+    Краткие сведения о скважине для сводки пакета: интервалы, число точек и миниатюра графика
+    (если ее нет в результате, она строится по ряду из series_store).
+    """
+    thumb_url = result.get("thumb_url")
+    if thumb_url is None:
+        series = series_store.load(result_key(result["digest"]))
+        if series is not None:
+            thumb_url = render_thumbnail(series[0], series[1], result["recovery"], result["drop"])
+    return {
+        "recovery": [[float(start), float(end)] for start, end in result["recovery"]],
+        "drop": [[float(start), float(end)] for start, end in result["drop"]],
+        "points": result["points"],
+        "thumb_url": thumb_url,
+    }
+
+def start_batch(files):
+    """
+    Сохраняет CSV-файлы загрузки (в том числе из архивов zip и tar) и ставит их анализ
+    в очередь. Распакованный размер каждого файла и всей загрузки ограничен
+    (BATCH_MAX_MEMBER_BYTES, BATCH_MAX_TOTAL_BYTES). После распаковки место в очереди
+    резервируется сразу под все задачи пакета; если его не хватает, пакет отклоняется
+    целиком (QueueFullError). Файлы отклоненного пакета удаляются. Возвращает идентификатор пакета.
+    """
+    upload_dir = app.config['UPLOAD_FOLDER']
+    # Файлы сохраняются во временную папку и переносятся в папку загрузок, только когда пакет
+    # принят: файлы отклоненного пакета не должны оставаться в uploads/ (ее обрабатывает watch.py)
+    staging = tempfile.mkdtemp(dir=upload_dir, prefix=".batch-")
+    try:
+        wells = []
+        paths = []
+        saved_bytes = 0
+        for file in files:
+            for name, stream in iter_upload_members(file.filename, file.stream):
+                if len(wells) >= BATCH_MAX_FILES:
+                    raise ValueError(f"В загрузке больше {BATCH_MAX_FILES} CSV-файлов")
+                if saved_bytes >= BATCH_MAX_TOTAL_BYTES:
+                    raise ValueError(f"Загрузка больше {BATCH_MAX_TOTAL_BYTES} байт после распаковки")
+                with metrics.stage("app.upload_save"):
+                    digest, file_path = save_member(stream, staging, name,
+                                                    max_bytes=min(BATCH_MAX_MEMBER_BYTES, BATCH_MAX_TOTAL_BYTES - saved_bytes))
+                saved_bytes += os.path.getsize(file_path)
+                wells.append({"name": os.path.basename(name), "digest": digest, "job_id": None, "summary": None})
+                paths.append(file_path)
+        if not wells:
+            raise ValueError("В загрузке нет CSV-файлов")
+
+        todo = []
+        for well, file_path in zip(wells, paths):
+            result = result_cache.get(result_key(well["digest"]))
+            if result is not None:
+                well["summary"] = well_summary(result)
+            else:
+                todo.append((well, os.path.join(upload_dir, os.path.basename(file_path))))
+        job_queue.reserve(len(todo))
+        submitted = 0
+        try:
+            for file_path in paths:
+                os.replace(file_path, os.path.join(upload_dir, os.path.basename(file_path)))
+            for well, file_path in todo:
+                well["job_id"] = submit_analysis(well["digest"], file_path, thumbnail=True, reserved=True)
+                submitted += 1
+        finally:
+            job_queue.release(len(todo) - submitted)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    batch_id = uuid.uuid4().hex
+    save_batch({"id": batch_id, "created": time.time(), "wells": wells})
+    return batch_id
+
+def save_batch(batch):
+    """
+    Записывает сведения о пакете в BATCH_STATE_DIR и удаляет самые старые пакеты
+    сверх BATCH_MAX_KEPT.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=BATCH_STATE_DIR, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(batch, f)
+    os.replace(tmp_path, os.path.join(BATCH_STATE_DIR, batch["id"] + ".json"))
+    saved = []
+    for name in os.listdir(BATCH_STATE_DIR):
+        path = os.path.join(BATCH_STATE_DIR, name)
+        try:
+            if not name.startswith("."):
+                saved.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            continue  # пакет удален другим процессом
+    for _, path in sorted(saved)[:max(0, len(saved) - BATCH_MAX_KEPT)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def load_batch(batch_id):
+    """
+    Сведения о пакете или None, если пакет не найден.
+    """
+    if not batch_id.isalnum():
+        return None
+    try:
+        with open(os.path.join(BATCH_STATE_DIR, batch_id + ".json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def batch_state(batch):
+    """
+    Состояние скважин пакета: done (со сводкой), queued, running или failed (с ошибкой).
+    """
+    wells = []
+    for well in batch["wells"]:
+        entry = {"name": well["name"], "digest": well["digest"]}
+        summary = well["summary"]
+        if summary is not None:
+            entry.update(summary, state="done")
+        else:
+            status = job_queue.status(well["job_id"])
+            if status is None:
+                entry.update(state="failed", error="Задача не найдена")
+            elif status["state"] == "failed":
+                entry.update(state="failed", error=status["error"])
+            elif status["state"] == "done":
+                entry.update(well_summary(job_queue.result(well["job_id"])), state="done")
+            else:
+                entry["state"] = status["state"]
+        wells.append(entry)
+    return wells
+
+def accept_batch(batch_id):
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(batch_id=batch_id, status_url=url_for('batch_status', batch_id=batch_id),
+                       result_url=url_for('batch_result', batch_id=batch_id)), 202
+    return redirect(url_for('batch_result', batch_id=batch_id), code=303)
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
         if 'use_test_data' in request.form:
-            if os.path.exists(os.path.join("data", "well_data.csv")):
-                data = load_data(os.path.join("data", "well_data.csv"))
-                recovery_intervals, drop_intervals, derivative = detect_patterns(data)
-                plot_url, data_with_derivative = plot_intervals(data, recovery_intervals, drop_intervals, derivative)
-                return render_template('result.html', plot_url=plot_url, recovery=recovery_intervals, drop=drop_intervals, data=data_with_derivative)
-            else:
+            test_path = os.path.join("data", "well_data.csv")
+            if not os.path.exists(test_path):
                 return "Файл data/well_data.csv не найден!"
+            digest = file_digest(test_path)
+            result = result_cache.get(result_key(digest))
+            if result is not None:
+                return render_result(result)
+            return accept_job(submit_analysis(digest, test_path))
 
-        if 'file' not in request.files:
-            return redirect(request.url)
-        file = request.files['file']
-        if file.filename == '':
+        files = [file for file in request.files.getlist('file') if file.filename]
+        if not files:
             return redirect(request.url)
+        if len(files) > 1 or not files[0].filename.lower().endswith(".csv"):
+            # Несколько файлов или архив: пакетная обработка со страницей сводки
+            try:
+                batch_id = start_batch(files)
+            except (ValueError, zipfile.BadZipFile, tarfile.TarError) as exc:
+                return f"Не удалось обработать загрузку: {exc}", 400
+            return accept_batch(batch_id)
+        file = files[0]
         if file:
-            filename = secure_filename(file.filename)
+            digest = stream_digest(file.stream)
+            result = result_cache.get(result_key(digest))
+            if result is not None:
+                return render_result(result)
+
+            # Префикс хэша не дает одноименным загрузкам перезаписать файл ожидающей задачи
+            filename = f"{digest[:12]}_{secure_filename(file.filename)}"
             file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
+            file.stream.seek(0)
+            with metrics.stage("app.upload_save"):
+                file.save(file_path)
+            return accept_job(submit_analysis(digest, file_path))
+    return render_template('index.html')
 
-            data = load_data(file_path)
-            recovery_intervals, drop_intervals, derivative = detect_patterns(data)
-            plot_url, data_with_derivative = plot_intervals(data, recovery_intervals, drop_intervals, derivative)
+@app.errorhandler(QueueFullError)
+def queue_full(error):
+    """
+    Очередь заполнена: просим клиента повторить запрос позже.
+    """
+    return "Сервер перегружен, повторите попытку позже.", 503, {"Retry-After": "5"}
 
-            return render_template('result.html', plot_url=plot_url, recovery=recovery_intervals, drop=drop_intervals, data=data_with_derivative)
-    return render_template('index.html')
+@app.route('/jobs/<job_id>/status')
+def job_status(job_id):
+    """
+    Состояние фоновой задачи в формате JSON.
+    """
+    status = job_queue.status(job_id)
+    if status is None:
+        return jsonify(error="Задача не найдена"), 404
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>')
+def job_result(job_id):
+    """
+    Страница результата задачи; пока задача выполняется, страница обновляется сама.
+    """
+    status = job_queue.status(job_id)
+    if status is None:
+        return "Задача не найдена", 404
+    if status["state"] == "done":
+        return render_result(job_queue.result(job_id))
+    if status["state"] == "failed":
+        return f"Ошибка обработки файла: {status['error']}", 500
+    return render_template('job.html', status=status), 202
+
+@app.route('/batches/<batch_id>/status')
+def batch_status(batch_id):
+    """
+    Состояние скважин пакета в формате JSON (без миниатюр).
+    """
+    batch = load_batch(batch_id)
+    if batch is None:
+        return jsonify(error="Пакет не найден"), 404
+    wells = [{key: value for key, value in well.items() if key != "thumb_url"} for well in batch_state(batch)]
+    return jsonify(id=batch_id, wells=wells)
+
+@app.route('/batches/<batch_id>')
+def batch_result(batch_id):
+    """
+    Сводка пакета: интервалы и миниатюры графиков по скважинам. Пока часть скважин
+    обрабатывается, страница обновляется сама.
+    """
+    batch = load_batch(batch_id)
+    if batch is None:
+        return "Пакет не найден", 404
+    wells = batch_state(batch)
+    pending = sum(well["state"] in ("queued", "running") for well in wells)
+    with metrics.stage("app.template_render"):
+        page = render_template('batch.html', wells=wells, pending=pending,
+                               done=sum(well["state"] == "done" for well in wells))
+    return page, 202 if pending else 200
+
+# Параметры detect_patterns, которые можно передать в /api/detect через строку запроса
+API_PARAM_TYPES = {
+    "window_size": int,
+    "threshold": float,
+    "min_points": int,
+    "noise_threshold": float,
+    "min_recovery_duration": float,
+    "min_drop_duration": float,
+    "low_density_threshold": float,
+    "merge": lambda value: value.lower() in ("1", "true", "yes"),
+}
+
+def parse_detect_params(args):
+    """
+    Извлекает параметры обнаружения из строки запроса с приведением типов.
+    """
+    return {name: cast(args[name]) for name, cast in API_PARAM_TYPES.items() if name in args}
+
+@app.route('/api/detect', methods=['POST'])
+def api_detect():
+    """
+    Обнаружение интервалов для машинных клиентов.
+
+    Тело запроса — CSV (время, давление), которое разбирается по мере поступления,
+    проверяется (detect_stream_segments) и обрабатывается потоковым детектором на каждом
+    непрерывном участке, без графика и таблицы. Параметры обнаружения передаются в строке
+    запроса; summary=1 добавляет сводную статистику ряда. Если ряд пришлось исправить
+    или разделить, в ответ добавляется отчет quality; слишком короткий ряд — ошибка 400.
+    """
+    try:
+        params = parse_detect_params(request.args)
+    except ValueError as exc:
+        return jsonify(error=f"Некорректный параметр: {exc}"), 400
+
+    summary = SeriesSummary()
+    try:
+        recovery_intervals, drop_intervals, quality = detect_stream_segments(
+            summary.track(iter_csv_stream(request.stream)), **params)
+    except (ValueError, pd.errors.ParserError) as exc:
+        return jsonify(error=f"Не удалось обработать данные: {exc}"), 400
+
+    response = {
+        "recovery": [[float(start), float(end)] for start, end in recovery_intervals],
+        "drop": [[float(start), float(end)] for start, end in drop_intervals],
+    }
+    if has_issues(quality):
+        response["quality"] = quality
+    if request.args.get("summary", "0").lower() in ("1", "true", "yes"):
+        response["summary"] = dict(summary.as_dict(), recovery_count=len(recovery_intervals),
+                                   drop_count=len(drop_intervals))
+    return jsonify(response)
+
+@app.route('/api/series/<digest>')
+def api_series(digest):
+    """
+    Срез ряда (время, давление, производная) для постраничной таблицы:
+    offset — номер первой строки, limit — число строк. Ряд читается из series_store,
+    поэтому доступен и после вытеснения результата из кэша, и в другом процессе.
+    """
+    series = series_store.load(result_key(digest))
+    if series is None:
+        return jsonify(error="Результат не найден или устарел"), 404
+    try:
+        offset = max(0, int(request.args.get("offset", 0)))
+        limit = min(TABLE_MAX_PAGE_SIZE, max(0, int(request.args.get("limit", TABLE_PAGE_SIZE))))
+    except ValueError:
+        return jsonify(error="offset и limit должны быть целыми числами"), 400
+    rows = slice(offset, offset + limit)
+    return jsonify(offset=offset, total=series.shape[1],
+                   time=series[0, rows].tolist(),
+                   pressure=series[1, rows].tolist(),
+                   derivative=series[2, rows].tolist())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Время по этапам обработки, состояние кэша результатов и очереди задач в формате Prometheus.
+    """
+    cache = result_cache.stats()
+    queue = job_queue.stats()
+    text = metrics.render_prometheus(extra_counters={
+        "siam_result_cache_hits_total": cache["hits"],
+        "siam_result_cache_misses_total": cache["misses"],
+        "siam_result_cache_evictions_total": cache["evictions"],
+    }, extra_gauges={
+        "siam_result_cache_items": cache["items"],
+        "siam_result_cache_bytes": cache["bytes"],
+        "siam_job_queue_pending": queue["pending"],
+    })
+    return text, 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+@app.route('/cache/stats')
+def cache_stats():
+    """
+    Счетчики кэша результатов (попадания, промахи, вытеснения, размер).
+    """
+    return jsonify(result_cache.stats())
 
-def main():
+def main(argv=None):
     """
-    Основная функция для запуска веб-приложения.
+    Основная функция для запуска веб-приложения встроенным сервером Flask.
+    Отладчик Werkzeug позволяет выполнять произвольный код из браузера,
+    поэтому он включается только явно, флагом --debug.
     """
-    app.run(debug=True)
+    parser = argparse.ArgumentParser(description="Запуск веб-приложения встроенным сервером Flask")
+    parser.add_argument("--debug", action="store_true", help="отладчик и автоматическая перезагрузка")
+    args = parser.parse_args(argv)
+    app.run(debug=args.debug)
 
 if __name__ == '__main__':
     main()
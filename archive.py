@@ -0,0 +1,78 @@
+import hashlib
+import os
+import tarfile
+import tempfile
+import zipfile
+from werkzeug.utils import secure_filename
+from config import BATCH_MAX_MEMBERS, BATCH_MAX_MEMBER_BYTES
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+def _check_member(name, size, index, max_member_bytes, max_members):
+    """
+    Ограничения на число членов архива и заявленный распакованный размер CSV-файла.
+    """
+    if index >= max_members:
+        raise ValueError(f"В архиве больше {max_members} членов")
+    if size > max_member_bytes:
+        raise ValueError(f"Файл {name} в архиве больше {max_member_bytes} байт после распаковки")
+
+
+def iter_upload_members(filename, stream, max_member_bytes=BATCH_MAX_MEMBER_BYTES, max_members=BATCH_MAX_MEMBERS):
+    """
+    Перебирает CSV-файлы загрузки: сам файл (.csv) или члены архива (.zip, .tar.*).
+    Возвращает пары (имя, бинарный поток). Архив разбирается по мере чтения: tar —
+    потоково (без перемотки), zip — по оглавлению в конце потока, без распаковки на диск.
+    Остальные члены архива пропускаются. Архив, в котором больше max_members членов
+    или заявленный размер CSV-файла (ZipInfo.file_size, TarInfo.size) больше
+    max_member_bytes, отклоняется с ValueError до распаковки этого члена; фактический
+    размер при копировании ограничивает save_member.
+    """
+    lower = filename.lower()
+    if lower.endswith(".csv"):
+        yield filename, stream
+    elif lower.endswith(".zip"):
+        with zipfile.ZipFile(stream) as archive:
+            for index, info in enumerate(archive.infolist()):
+                is_csv = not info.is_dir() and info.filename.lower().endswith(".csv")
+                _check_member(info.filename, info.file_size if is_csv else 0, index, max_member_bytes, max_members)
+                if is_csv:
+                    with archive.open(info) as member:
+                        yield info.filename, member
+    elif lower.endswith(TAR_SUFFIXES):
+        with tarfile.open(fileobj=stream, mode="r|*") as archive:
+            for index, member in enumerate(archive):
+                is_csv = member.isfile() and member.name.lower().endswith(".csv")
+                _check_member(member.name, member.size if is_csv else 0, index, max_member_bytes, max_members)
+                if is_csv:
+                    yield member.name, archive.extractfile(member)
+    else:
+        raise ValueError(f"Неподдерживаемый тип файла: {filename}")
+
+
+def save_member(stream, upload_dir, name, block_size=1 << 20, max_bytes=None):
+    """
+    Копирует поток в upload_dir блоками, одновременно вычисляя хэш содержимого (как ingest.stream_digest).
+    Файл сохраняется под именем "<префикс хэша>_<имя>"; возвращает (хэш, путь).
+    Если поток длиннее max_bytes байт, копирование прерывается с ValueError.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            size = 0
+            for block in iter(lambda: stream.read(block_size), b""):
+                size += len(block)
+                if max_bytes is not None and size > max_bytes:
+                    raise ValueError(f"Файл {name} больше {max_bytes} байт после распаковки")
+                digest.update(block)
+                f.write(block)
+        digest = digest.hexdigest()
+        path = os.path.join(upload_dir, f"{digest[:12]}_{secure_filename(os.path.basename(name))}")
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest, path
@@ -0,0 +1,163 @@
+"""
+Набор замеров производительности основных операций на синтетических рядах разной длины.
+
+Для каждого размера ряда измеряются время (лучшее из нескольких повторов), пропускная
+способность (точек в секунду) и пиковая память (tracemalloc, отдельным прогоном) для
+detect_patterns, calculate_f1_score, plot_intervals и загрузки CSV. Замер detect_stream
+генерирует ряд блоками и обнаруживает интервалы StreamingDetector, не собирая ряд
+в памяти, поэтому выполняется для любой длины; остальные замеры держат ряд целиком
+и выполняются только для рядов не длиннее --max-batch точек. Результаты сохраняются
+в JSON и могут сравниваться с ранее сохраненной базовой линией:
+
+    python bench.py --sizes 1e3 1e4 1e5 --output bench_results.json
+    python bench.py --sizes 1e3 1e4 1e5 --compare bench_results.json
+    python bench.py --sizes 1e8 --repeat 1 --no-memory
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+from data import SeriesSpec
+from search import detect_patterns
+from f1score import calculate_f1_score
+from render import plot_intervals
+from stream import detect_stream
+
+DEFAULT_SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+MAX_BATCH_POINTS = 10 ** 7  # длиннее — только потоковый замер (ряд целиком не помещается в память)
+
+
+def _best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_cases(spec, work_dir, max_batch=MAX_BATCH_POINTS):
+    """
+    Возвращает словарь {название операции: функция без аргументов} для ряда spec.
+    Если в ряду больше max_batch точек, возвращается только потоковый замер.
+    """
+    cases = {"detect_stream": lambda: detect_stream(spec.blocks())}
+    if spec.n_points > max_batch:
+        return cases
+
+    data = spec.frame()
+    truth = spec.truth()
+    csv_path = os.path.join(work_dir, f"series_{spec.n_points}.csv")
+    spec.to_csv(csv_path)
+    recovery_intervals, drop_intervals, derivative = detect_patterns(data)
+
+    def load_csv():
+        frame = pd.read_csv(csv_path)
+        frame.columns = ["Время (часы)", "Давление (атм)"]
+
+    return dict(cases, **{
+        "load_csv": load_csv,
+        "detect_patterns": lambda: detect_patterns(data),
+        "calculate_f1_score": lambda: calculate_f1_score(truth["recovery"], recovery_intervals, data),
+        "plot_intervals": lambda: plot_intervals(data, recovery_intervals, drop_intervals, derivative),
+    })
+
+
+def run(sizes, repeat=3, memory=True, max_batch=MAX_BATCH_POINTS, **spec_params):
+    """
+    Выполняет замеры для всех размеров и возвращает результаты в виде словаря.
+    """
+    results = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "max_batch": max_batch,
+            "spec": spec_params,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in sizes:
+            spec = SeriesSpec(n_points=size, **spec_params)
+            cases = benchmark_cases(spec, work_dir, max_batch)
+            for name, fn in cases.items():
+                seconds = _best_time(fn, repeat)
+                entry = {"seconds": seconds, "points_per_second": size / seconds if seconds else None}
+                if memory:
+                    entry["peak_bytes"] = _peak_memory(fn)
+                results["results"].setdefault(name, {})[str(size)] = entry
+                print(f"{name:>20} n={size:>10}  {seconds:9.4f} с  "
+                      f"{entry['points_per_second'] or 0:14.0f} точек/с", flush=True)
+    return results
+
+
+def compare(current, baseline, tolerance=0.2):
+    """
+    Сравнивает результаты с базовой линией. Возвращает список замедлений
+    (название, размер, отношение времени), превышающих tolerance.
+    """
+    regressions = []
+    for name, by_size in current["results"].items():
+        for size, entry in by_size.items():
+            base = baseline["results"].get(name, {}).get(size)
+            if base is None:
+                continue
+            ratio = entry["seconds"] / base["seconds"]
+            marker = "  <-- замедление" if ratio > 1 + tolerance else ""
+            print(f"{name:>20} n={size:>10}  {ratio:6.2f}x{marker}")
+            if ratio > 1 + tolerance:
+                regressions.append((name, size, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности на синтетических данных")
+    parser.add_argument("--sizes", nargs="+", type=float, default=DEFAULT_SIZES,
+                        help="длины рядов (например, 1e3 1e5 1e8)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="не замерять пиковую память")
+    parser.add_argument("--max-batch", type=float, default=MAX_BATCH_POINTS,
+                        help="наибольшая длина ряда для замеров, держащих ряд целиком в памяти")
+    parser.add_argument("--step", type=float, default=1 / 60, help="шаг по времени, часы")
+    parser.add_argument("--irregular", type=float, default=0.0, help="доля случайного отклонения шага")
+    parser.add_argument("--noise", type=float, default=0.5, help="СКО шума давления, атм")
+    parser.add_argument("--events", type=int, default=10, help="число событий КВД/КПД")
+    parser.add_argument("--shape", default="linear", help="форма события")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json", help="куда сохранить результаты")
+    parser.add_argument("--compare", help="JSON с базовой линией для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое замедление (доля)")
+    args = parser.parse_args(argv)
+
+    results = run([int(size) for size in args.sizes], args.repeat, not args.no_memory, int(args.max_batch),
+                  step=args.step, irregular=args.irregular, noise=args.noise,
+                  n_events=args.events, shape=args.shape, seed=args.seed)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        return 1 if compare(results, baseline, args.tolerance) else 0
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from config import SERIES_DIR, SERIES_MAX_BYTES
+
+
+class ResultCache:
+    """
+    Потокобезопасный LRU-кэш результатов анализа с ограничением по числу записей,
+    суммарному размеру и времени жизни (TTL).
+
+    Ведет счетчики попаданий, промахов и вытеснений, доступные через stats().
+    """
+
+    def __init__(self, max_items=64, max_bytes=256 * 1024 ** 2, ttl=3600.0):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # ключ -> (значение, размер, момент истечения)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Возвращает значение по ключу или None, если записи нет или она устарела.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        """
+        Сохраняет значение размером size байт, вытесняя давно не использовавшиеся записи.
+        Значение больше max_bytes не кэшируется.
+        """
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_items or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Счетчики и текущий размер кэша.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "items": len(self._entries),
+                "bytes": self._bytes,
+                "max_items": self.max_items,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+class SeriesStore:
+    """
+    Ряды результатов (время, давление, производная) на диске: по одному .npy-файлу
+    (3 × n точек) на ключ. Ряд читается через mmap, поэтому срез для страницы таблицы
+    не загружает файл целиком. Ряды не зависят от ограничений и времени жизни ResultCache
+    и доступны всем процессам приложения. При превышении max_bytes удаляются ряды,
+    записанные раньше всех.
+    """
+
+    def __init__(self, directory=SERIES_DIR, max_bytes=SERIES_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.blake2b(key.encode(), digest_size=20).hexdigest() + ".npy")
+
+    def save(self, key, time, pressure, derivative):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-", suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.vstack((time, pressure, derivative)).astype(np.float64, copy=False))
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    def load(self, key):
+        """
+        Массив 3 × n (время, давление, производная), отображенный в память, или None.
+        """
+        try:
+            return np.load(self._path(key), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # удален параллельным процессом
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
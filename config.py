@@ -24,3 +24,81 @@ LOW_DENSITY_THRESHOLD: float = 10.0
 # Смещение и расчет интервалов (магические числа, вынесены сюда для пояснения)
 PEAK_OFFSET: int = 30  # смещение для определения начала интервала (индексов)
 RECOVERY_DURATION_POINTS: int = 240  # длительность интервала КВД в точках (например, 4 часа при 10-минутном шаге)
+
+# Те же окна в часах для режима time_windows (соответствуют точкам выше при шаге 1 минута)
+PEAK_OFFSET_HOURS: float = 0.5
+RECOVERY_DURATION_HOURS: float = 4.0
+DENSITY_CHECK_HOURS: float = 0.1  # аналог проверки start_idx + 6 в check_point_density
+
+# Потоковая и поблочная обработка
+CHUNK_SIZE: int = 100_000  # количество строк CSV, читаемых за один раз
+WORKERS: int | None = None  # число процессов для пакетной обработки (None — по числу ядер)
+
+# Бинарный кэш загруженных CSV-файлов
+INGEST_CACHE_DIR: str = ".cache/wells"
+INGEST_CACHE_MAX_BYTES: int = 2 * 1024 ** 3  # 2 ГБ
+
+# Кэш результатов анализа в веб-приложении
+RESULT_CACHE_MAX_ITEMS: int = 64
+RESULT_CACHE_MAX_BYTES: int = 256 * 1024 ** 2  # 256 МБ
+RESULT_CACHE_TTL: float = 3600.0  # время жизни записи (в секундах)
+SERIES_DIR: str = ".cache/series"  # ряды результатов для таблицы данных (/api/series)
+SERIES_MAX_BYTES: int = 2 * 1024 ** 3  # 2 ГБ, дальше удаляются самые старые ряды
+
+# Очередь фоновых задач веб-приложения
+JOB_WORKERS: int = 2  # число процессов, выполняющих анализ загрузок
+JOB_MAX_PENDING: int = 64  # максимум незавершенных задач, дальше — ответ 503
+JOB_MAX_FINISHED: int = 256  # сколько завершенных задач хранить для получения результата
+JOB_STATE_DIR: str = ".cache/jobs"  # состояние и результаты задач, общие для процессов веб-сервера
+JOB_STATE_TTL: float = 24 * 3600  # файлы состояния задач старше этого (секунд) удаляются
+
+# Отображение результатов
+PLOT_WIDTH_PX: int = 1200  # ширина графика в пикселях (определяет степень прореживания ряда)
+TABLE_PAGE_SIZE: int = 100  # строк на странице таблицы данных
+TABLE_MAX_PAGE_SIZE: int = 5000
+
+# Замеры времени по этапам обработки (metrics.py)
+METRICS_ENABLED: bool = True
+METRICS_TRACE_MEMORY: bool = False  # отслеживание пиковой памяти через tracemalloc (заметно замедляет работу)
+
+# Многомасштабное обнаружение (detect_patterns(pyramid=True))
+PYRAMID_FACTOR: int = 64  # размер блока грубого уровня в точках
+
+# Наблюдение за папками с новыми файлами скважин (watch.py)
+WATCH_DIRS: tuple = ("uploads", "data")
+WATCH_INTERVAL: float = 1.0  # период опроса папок (в секундах)
+WATCH_DEBOUNCE: float = 2.0  # файл обрабатывается, если не менялся столько секунд
+WATCH_RESCAN: float = 60.0  # период полного перечитывания папок (файлы, перезаписанные без уведомления)
+WATCH_OUTPUT: str = "watch_results.jsonl"
+
+# Загрузка нескольких файлов и архивов
+BATCH_MAX_FILES: int = 64  # максимум CSV-файлов в одной загрузке (пакет ставится в очередь целиком)
+BATCH_MAX_MEMBERS: int = 10_000  # максимум членов архива, включая пропускаемые
+BATCH_MAX_MEMBER_BYTES: int = 512 * 1024 ** 2  # максимум распакованного размера одного файла
+BATCH_MAX_TOTAL_BYTES: int = 2 * 1024 ** 3  # максимум распакованного размера всей загрузки
+BATCH_MAX_KEPT: int = 32  # сколько последних пакетов хранить для страницы сводки
+BATCH_STATE_DIR: str = ".cache/batches"  # сведения о пакетах, общие для процессов веб-сервера
+THUMB_WIDTH_PX: int = 320  # ширина миниатюры графика на странице сводки
+
+# Построение графиков (render.py)
+RENDER_WORKERS: int = 2  # потоков для одновременного построения графиков в одном процессе
+
+# Рабочий сервер (serve.py)
+SERVE_BIND: str = "0.0.0.0:5000"
+SERVE_WORKERS: int = 2  # процессов; задачи и пакеты общие (на диске), кэш результатов — свой у каждого
+SERVE_THREADS: int = 8  # потоков обработки запросов в каждом процессе
+SERVE_TIMEOUT: int = 120  # секунд на запрос (в том числе синхронный /api/detect)
+WARMUP_FILE: str = "data/well_data.csv"  # файл для прогрева перед запуском процессов
+
+# Диагностика КВД по производной Бурде (diagnostics.py)
+BOURDET_SMOOTHING: float = 0.2  # окно сглаживания L по натуральному логарифму времени с начала КВД
+STORAGE_SLOPE: float = 0.5  # наклон log-log производной, выше которого — влияние ствола скважины (теоретически 1)
+RADIAL_SLOPE_TOL: float = 0.2  # |наклон| не больше — радиальный приток (работа пласта)
+
+# Хранилище результатов (store.py)
+RESULTS_DB: str = "results.db"
+
+# Проверка качества ряда перед обнаружением (quality.py)
+MAX_GAP_STEPS: float = 60.0  # шаг времени больше медианного во столько раз — разрыв, делящий ряд на участки
+MIN_SEGMENT_POINTS: int = 20  # более короткие участки (и участки короче окна сглаживания) не анализируются
+SEGMENT_PARALLEL_POINTS: int = 500_000  # с такой длины участки ряда обрабатываются в пуле потоков
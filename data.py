@@ -1,23 +1,159 @@
 import numpy as np
 import pandas as pd
+from series import COLUMNS, WellSeries
 
-# Создаем массив времени с шагом 1 минута (1/60 часа) от 0 до 30 часов
-time = np.arange(0, 30, 1/60)  # 30 часов, шаг 1 минута
+BLOCK_SIZE = 1 << 20  # точки генерируются блоками фиксированного размера, чтобы результат не зависел от chunksize
+SHAPES = ("linear", "exponential", "log", "step")
 
-# Инициализируем давление базовым значением 100 атм
-pressure = np.full_like(time, 100.0, dtype=float)
 
-# Интервал КВД: увеличение давления от 5 до 9 часов (4 часа)
-mask_recovery = (time >= 5) & (time <= 9)
-pressure[mask_recovery] = np.linspace(100, 140, np.sum(mask_recovery))
+def make_sample():
+    """
+    Фиксированный пример: 30 часов с шагом 1 минута, один КВД (5–9 ч) и один КПД (15–19 ч).
+    """
+    # Создаем массив времени с шагом 1 минута (1/60 часа) от 0 до 30 часов
+    time = np.arange(0, 30, 1/60)  # 30 часов, шаг 1 минута
 
-# Интервал КПД: снижение давления от 15 до 19 часов (4 часа)
-mask_drop = (time >= 15) & (time <= 19)
-pressure[mask_drop] = np.linspace(140, 100, np.sum(mask_drop))
+    # Инициализируем давление базовым значением 100 атм
+    pressure = np.full_like(time, 100.0, dtype=float)
 
-# Формируем DataFrame и сохраняем в CSV
-df = pd.DataFrame({"Время (часы)": time, "Давление (атм)": pressure})
-df.to_csv("sample_dat.csv", index=False)
+    # Интервал КВД: увеличение давления от 5 до 9 часов (4 часа)
+    mask_recovery = (time >= 5) & (time <= 9)
+    pressure[mask_recovery] = np.linspace(100, 140, np.sum(mask_recovery))
 
-print("Файл sample_dat.csv успешно создан.")
+    # Интервал КПД: снижение давления от 15 до 19 часов (4 часа)
+    mask_drop = (time >= 15) & (time <= 19)
+    pressure[mask_drop] = np.linspace(140, 100, np.sum(mask_drop))
 
+    return pd.DataFrame({COLUMNS[0]: time, COLUMNS[1]: pressure})
+
+
+def _shape(fraction, shape):
+    """
+    Доля изменения давления, достигнутая к моменту fraction (от 0 до 1) внутри события.
+    """
+    if shape == "linear":
+        return fraction
+    if shape == "exponential":
+        return (1 - np.exp(-5 * fraction)) / (1 - np.exp(-5))
+    if shape == "log":
+        return np.log1p(50 * fraction) / np.log1p(50)
+    if shape == "step":
+        return np.minimum(1.0, fraction * 20)
+    raise ValueError(f"Неизвестная форма события: {shape}")
+
+
+class SeriesSpec:
+    """
+    Параметры синтетического ряда давления.
+
+    n_points — число точек; step — средний шаг по времени (часы); irregular — доля
+    случайного отклонения шага (0 — равномерная сетка); noise — СКО шума давления (атм);
+    n_events — число событий, чередующихся КВД и КПД; shape — форма события (SHAPES);
+    seed — зерно генератора, при одинаковых параметрах ряд воспроизводится точно.
+    """
+
+    def __init__(self, n_points=1800, step=1/60, irregular=0.0, noise=0.0, n_events=2, shape="linear",
+                 base_pressure=100.0, min_event_hours=2.0, max_event_hours=6.0, seed=0):
+        if shape not in SHAPES:
+            raise ValueError(f"Неизвестная форма события: {shape}")
+        self.n_points = int(n_points)
+        self.step = step
+        self.irregular = irregular
+        self.noise = noise
+        self.n_events = n_events
+        self.shape = shape
+        self.base_pressure = base_pressure
+        self.min_event_hours = min_event_hours
+        self.max_event_hours = max_event_hours
+        self.seed = seed
+
+    def events(self):
+        """
+        Начала, длительности и амплитуды событий. Нечетные события — КВД (рост давления),
+        четные — КПД (падение). События не пересекаются.
+        """
+        rng = np.random.default_rng([self.seed, 0])
+        total = self.n_points * self.step
+        slot = total / (self.n_events + 1)
+        durations = rng.uniform(self.min_event_hours, self.max_event_hours, self.n_events)
+        durations = np.minimum(durations, 0.8 * slot)
+        starts = slot * (np.arange(self.n_events) + 0.5) + rng.uniform(0, 0.2, self.n_events) * slot
+        amplitudes = rng.uniform(20, 60, self.n_events) * np.where(np.arange(self.n_events) % 2 == 0, 1, -1)
+        return starts, durations, amplitudes
+
+    def truth(self):
+        """
+        Истинные интервалы КВД и КПД в формате [[начало, конец], ...].
+        """
+        starts, durations, amplitudes = self.events()
+        intervals = np.column_stack((starts, starts + durations)).tolist()
+        return {
+            "recovery": [interval for interval, amp in zip(intervals, amplitudes) if amp > 0],
+            "drop": [interval for interval, amp in zip(intervals, amplitudes) if amp < 0],
+        }
+
+    def blocks(self):
+        """
+        Генерирует ряд блоками по BLOCK_SIZE точек и возвращает пары (время, давление).
+        Память не зависит от n_points.
+        """
+        starts, durations, amplitudes = self.events()
+        levels = self.base_pressure + np.concatenate(([0.0], np.cumsum(amplitudes)))
+        t0 = 0.0
+        for block, first in enumerate(range(0, self.n_points, BLOCK_SIZE)):
+            count = min(BLOCK_SIZE, self.n_points - first)
+            rng = np.random.default_rng([self.seed, 1, block])
+            steps = np.full(count, self.step)
+            if self.irregular:
+                steps *= 1 + self.irregular * rng.uniform(-1, 1, count)
+            time = t0 + np.concatenate(([0.0], np.cumsum(steps[:-1])))
+            t0 = time[-1] + steps[-1]
+
+            # Номер последнего начавшегося события и доля его прохождения
+            event = np.searchsorted(starts, time, side="right") - 1
+            pressure = levels[event + 1].copy()
+            active = event >= 0
+            fraction = np.ones_like(time)
+            fraction[active] = (time[active] - starts[event[active]]) / durations[event[active]]
+            ongoing = active & (fraction < 1)
+            pressure[ongoing] = (levels[event[ongoing]]
+                                 + amplitudes[event[ongoing]] * _shape(fraction[ongoing], self.shape))
+            if self.noise:
+                pressure += rng.normal(0, self.noise, count)
+            yield time, pressure
+
+    def frame(self):
+        """
+        Весь ряд в виде DataFrame с колонками COLUMNS.
+        """
+        blocks = list(self.blocks())
+        return pd.DataFrame({
+            COLUMNS[0]: np.concatenate([time for time, _ in blocks]),
+            COLUMNS[1]: np.concatenate([pressure for _, pressure in blocks]),
+        })
+
+    def series(self, dtype=np.float64):
+        """
+        Весь ряд в виде WellSeries.
+        """
+        blocks = list(self.blocks())
+        return WellSeries(np.concatenate([time for time, _ in blocks]),
+                          np.concatenate([pressure for _, pressure in blocks]), dtype)
+
+    def to_csv(self, file_path):
+        """
+        Записывает ряд в CSV по блокам, не собирая его целиком в памяти.
+        """
+        header = True
+        for time, pressure in self.blocks():
+            pd.DataFrame({COLUMNS[0]: time, COLUMNS[1]: pressure}).to_csv(
+                file_path, mode="w" if header else "a", header=header, index=False)
+            header = False
+
+
+if __name__ == "__main__":
+    # Формируем DataFrame и сохраняем в CSV
+    df = make_sample()
+    df.to_csv("sample_dat.csv", index=False)
+
+    print("Файл sample_dat.csv успешно создан.")
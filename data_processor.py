@@ -1,27 +1,36 @@
 import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
 import pandas as pd
 from utils import safe_parse_intervals
-from search import detect_patterns
+from quality import validate_series, detect_segments, detect_stream_segments
+from stream import iter_csv_chunks
+from ingest import load_series
+import metrics
 from f1score import calculate_f1_score
 
 class DataProcessor:
     """
     Класс для обработки данных, загрузки истинной разметки и оценки качества алгоритма.
     """
-    def __init__(self, data_dir, intervals_dir):
+    def __init__(self, data_dir, intervals_dir, chunksize=None, dtype=np.float64):
         """
         Инициализация с указанием директорий с данными и истинной разметкой.
+        Если задан chunksize, обнаружение интервалов выполняется поблочно, без загрузки
+        всего файла в память. dtype=np.float32 вдвое уменьшает память под загруженные ряды.
         """
         self.data_dir = data_dir
         self.intervals_dir = intervals_dir
+        self.chunksize = chunksize
+        self.dtype = dtype
 
     def load_data(self, filename):
         """
-        Загружает данные из CSV-файла и переименовывает колонки.
+        Загружает ряд скважины из CSV-файла (через бинарный кэш) в виде WellSeries.
         """
-        data = pd.read_csv(os.path.join(self.data_dir, filename))
-        data.columns = ["Время (часы)", "Давление (атм)"]
-        return data
+        return load_series(os.path.join(self.data_dir, filename), self.dtype)
 
     def load_intervals(self, filename):
         """
@@ -32,16 +41,52 @@ class DataProcessor:
         true_drop = safe_parse_intervals(true_intervals["drop"].iloc[0])
         return true_recovery, true_drop
 
+    def load_time(self, filename):
+        """
+        Загружает только колонку времени (для оценки качества в поблочном режиме).
+        """
+        data = pd.read_csv(os.path.join(self.data_dir, filename), usecols=[0])
+        data.columns = ["Время (часы)"]
+        return data
+
+    def detect(self, filename, detect_params={}):
+        """
+        Применяет алгоритм к файлу целиком или поблочно, в зависимости от chunksize.
+        Окна по времени (time_windows) поддерживаются только при обработке целиком.
+        В обоих режимах ряд предварительно проверяется и делится на участки по разрывам;
+        слишком короткий ряд — ValueError.
+        """
+        if self.chunksize and not detect_params.get("time_windows"):
+            recovery_intervals, drop_intervals, _ = detect_stream_segments(
+                iter_csv_chunks(os.path.join(self.data_dir, filename), self.chunksize), **detect_params)
+            return recovery_intervals, drop_intervals
+        data, segments, _ = validate_series(self.load_data(filename), detect_params.get("window_size", 10))
+        recovery_intervals, drop_intervals, _ = detect_segments(data, segments, **detect_params)
+        return recovery_intervals, drop_intervals
+
+    def detect_file(self, filename, detect_params={}):
+        """
+        Только обнаружение интервалов в файле, без истинной разметки и оценки качества
+        (для скважин, у которых разметки нет).
+        """
+        with metrics.stage("processor.detect"):
+            recovery_intervals, drop_intervals = self.detect(filename, detect_params)
+        return {"file": filename, "recovery_intervals": recovery_intervals, "drop_intervals": drop_intervals}
+
     def process_file(self, filename, detect_params={}):
         """
         Обрабатывает один файл: загружает данные и истинные интервалы, применяет алгоритм,
         вычисляет F1-score и возвращает результаты в виде словаря.
+        В поблочном режиме для оценки качества загружается только колонка времени.
         """
-        data = self.load_data(filename)
-        true_recovery, true_drop = self.load_intervals(filename)
-        recovery_intervals, drop_intervals = detect_patterns(data, **detect_params)
-        f1_recovery = calculate_f1_score(true_recovery, recovery_intervals, data)
-        f1_drop = calculate_f1_score(true_drop, drop_intervals, data)
+        with metrics.stage("processor.detect"):
+            recovery_intervals, drop_intervals = self.detect(filename, detect_params)
+        with metrics.stage("processor.load_data"):
+            data = self.load_time(filename) if self.chunksize else self.load_data(filename)
+            true_recovery, true_drop = self.load_intervals(filename)
+        with metrics.stage("processor.score", len(data)):
+            f1_recovery = calculate_f1_score(true_recovery, recovery_intervals, data)
+            f1_drop = calculate_f1_score(true_drop, drop_intervals, data)
         return {
             "file": filename,
             "data": data,
@@ -50,3 +95,66 @@ class DataProcessor:
             "f1_recovery": f1_recovery,
             "f1_drop": f1_drop
         }
+
+    def list_files(self):
+        """
+        Возвращает отсортированный список CSV-файлов в директории с данными.
+        """
+        return sorted(f for f in os.listdir(self.data_dir) if f.endswith(".csv"))
+
+    def process_directory(self, filenames=None, detect_params={}, workers=None, keep_data=False, score=True):
+        """
+        Обрабатывает файлы скважин параллельно в пуле процессов.
+
+        Результаты возвращаются (генератором) по мере готовности, а не в порядке файлов.
+        Ошибка в одном файле не прерывает обработку: для него возвращается словарь
+        с ключами "file" и "error". Если процесс пула завершился аварийно (например,
+        из-за нехватки памяти), сбой получают все файлы, ожидавшие в этом пуле, поэтому
+        они делятся пополам и обрабатываются в новых пулах по группам; как ошибка
+        возвращается только файл, на котором падает пул из одного файла. Число процессов
+        задается workers (по умолчанию — число ядер). Исходные данные по умолчанию
+        не передаются обратно из процессов. При score=False файлы обрабатываются
+        detect_file: истинная разметка не загружается, оценки F1 не вычисляются.
+        Замеры этапов из дочерних процессов учитываются в статистике metrics текущего процесса.
+        """
+        groups = [self.list_files() if filenames is None else list(filenames)]
+        while groups:
+            group = groups.pop()
+            broken = []
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(_process_safely, self, filename, detect_params, keep_data, score): filename
+                           for filename in group}
+                for future in as_completed(futures):
+                    filename = futures[future]
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as exc:
+                        if len(group) > 1:
+                            broken.append(filename)
+                            continue
+                        result = {"file": filename, "error": f"{type(exc).__name__}: {exc}"}
+                    except Exception as exc:
+                        result = {"file": filename, "error": f"{type(exc).__name__}: {exc}"}
+                    metrics.merge(result.pop("metrics", None))
+                    yield result
+            # Файлы, ожидавшие в сломанном пуле: делим пополам, пока не останется виновный
+            half = (len(broken) + 1) // 2
+            groups.extend(part for part in (broken[half:], broken[:half]) if part)
+
+
+def _process_safely(processor, filename, detect_params, keep_data, score=True):
+    """
+    Обрабатывает файл в дочернем процессе, превращая исключение в запись об ошибке.
+    """
+    with metrics.capture() as records:
+        try:
+            if score:
+                result = processor.process_file(filename, detect_params)
+            else:
+                result = processor.detect_file(filename, detect_params)
+        except Exception as exc:
+            result = {"file": filename, "error": f"{type(exc).__name__}: {exc}", "traceback": traceback.format_exc()}
+    if not keep_data:
+        result.pop("data", None)
+    result["metrics"] = records
+    return result
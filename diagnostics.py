@@ -0,0 +1,185 @@
+"""
+Диагностика КВД по логарифмической производной давления (производной Бурде).
+
+Для каждого интервала КВД время отсчитывается от начала восстановления (Δt), а прирост
+давления — от давления в момент остановки (Δp). Производная dΔp/d ln Δt вычисляется
+по методу Бурде: для каждой точки берутся соседние точки, отстоящие не меньше чем на
+L по ln Δt слева и справа, и взвешиваются наклоны с обеих сторон. По наклону
+производной в log-log координатах выделяются режимы течения:
+
+- влияние ствола скважины (ВСС) — производная растет: в теории с наклоном 1, но к переходу
+  на радиальный приток наклон падает, а сглаживание окном L его занижает, поэтому ВСС
+  считаются точки с наклоном выше STORAGE_SLOPE (0.5 — середина между 0 и 1);
+- работа пласта (радиальный приток) — производная почти постоянна;
+- влияние границ — отклонение производной после участка радиального притока.
+
+Все интервалы скважины обрабатываются за один проход: точки интервалов собираются
+в общий массив, а соседние точки ищутся одним вызовом np.searchsorted по ключу
+"номер интервала + ln Δt", поэтому стоимость почти не зависит от числа интервалов.
+"""
+import numpy as np
+from config import BOURDET_SMOOTHING, STORAGE_SLOPE, RADIAL_SLOPE_TOL
+from series import as_series
+
+
+def _gather(time, pressure, intervals):
+    """
+    Точки всех интервалов в одном массиве: номер интервала, Δt и Δp. Началом
+    восстановления (остановкой скважины) считается точка минимума давления в интервале:
+    найденный интервал КВД может начинаться немного раньше. Точки до остановки
+    включительно не включаются. Возвращает также время остановки для каждого интервала.
+    """
+    bounds = np.asarray(intervals, dtype=np.float64).reshape(-1, 2)
+    starts = np.searchsorted(time, bounds[:, 0], side="left")
+    ends = np.searchsorted(time, bounds[:, 1], side="right")
+    lengths = np.maximum(ends - starts, 0)
+    offsets = np.cumsum(lengths) - lengths
+    segment = np.repeat(np.arange(len(bounds)), lengths)
+    index = np.arange(lengths.sum()) - offsets[segment] + starts[segment]
+    values = pressure[index]
+
+    shut_in = bounds[:, 0].copy()
+    shut = np.zeros(len(bounds), dtype=np.intp)
+    nonempty = lengths > 0
+    if nonempty.any():
+        lowest = np.minimum.reduceat(values, offsets[nonempty])
+        position = np.arange(len(values))
+        at_lowest = values == np.repeat(lowest, lengths[nonempty])
+        shut[nonempty] = np.minimum.reduceat(np.where(at_lowest, position, len(values)), offsets[nonempty])
+        shut_in[nonempty] = time[index[shut[nonempty]]]
+    dt = time[index] - shut_in[segment]
+    dp = values - values[shut[segment]] if len(values) else values
+    keep = dt > 0
+    return bounds, shut_in, segment[keep], dt[keep], dp[keep]
+
+
+def _neighbours(segment, x, smoothing, n_segments):
+    """
+    Индексы соседних точек слева и справа, отстоящих не меньше чем на smoothing по x
+    внутри того же интервала (у краев интервала — крайние точки).
+    """
+    counts = np.bincount(segment, minlength=n_segments)
+    first = (np.cumsum(counts) - counts)[segment]
+    last = np.cumsum(counts)[segment] - 1
+    # Интервалы разнесены по ключу дальше, чем на окно сглаживания
+    span = (x.max() - x.min()) + 2 * smoothing + 1
+    key = x + segment * span
+    left = np.maximum(np.searchsorted(key, key - smoothing, side="right") - 1, first)
+    right = np.minimum(np.searchsorted(key, key + smoothing, side="left"), last)
+    return left, right
+
+
+def _weighted_slope(values, x, left, right):
+    """
+    Наклон values по x в каждой точке по Бурде: среднее наклонов слева и справа
+    с весами по расстоянию до противоположного соседа.
+    """
+    dx_left = x - x[left]
+    dx_right = x[right] - x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope_left = (values - values[left]) / dx_left
+        slope_right = (values[right] - values) / dx_right
+        slope = (slope_left * dx_right + slope_right * dx_left) / (dx_left + dx_right)
+    slope = np.where(dx_left > 0, slope, slope_right)
+    return np.where(dx_right > 0, slope, np.where(dx_left > 0, slope_left, np.nan))
+
+
+def _bourdet(data, intervals, smoothing):
+    series = as_series(data)
+    time = np.asarray(series.time, dtype=np.float64)
+    pressure = np.asarray(series.pressure, dtype=np.float64)
+    bounds, shut_in, segment, dt, dp = _gather(time, pressure, intervals)
+    x = np.log(dt)
+    if len(dt):
+        left, right = _neighbours(segment, x, smoothing, len(bounds))
+    else:
+        left = right = segment
+    return bounds, shut_in, segment, dt, dp, x, left, right, _weighted_slope(dp, x, left, right)
+
+
+def bourdet_derivative(data, intervals, smoothing=BOURDET_SMOOTHING):
+    """
+    Производная Бурде для всех интервалов КВД за один проход.
+
+    Возвращает (segment, dt, dp, derivative): номер интервала каждой точки, время
+    с начала КВД (часы), прирост давления (атм) и dΔp/d ln Δt (атм). Точки упорядочены
+    по интервалам и времени.
+    """
+    if len(intervals) == 0 or len(as_series(data)) == 0:
+        empty = np.empty(0)
+        return np.empty(0, dtype=np.intp), empty, empty, empty
+    _, _, segment, dt, dp, _, _, _, derivative = _bourdet(data, intervals, smoothing)
+    return segment, dt, dp, derivative
+
+
+def diagnose_recoveries(data, intervals, smoothing=BOURDET_SMOOTHING,
+                        storage_slope=STORAGE_SLOPE, radial_tol=RADIAL_SLOPE_TOL):
+    """
+    Режимы течения для каждого интервала КВД по наклону производной Бурде в log-log
+    координатах (наклон сглаживается с тем же окном L).
+
+    Возвращает список словарей (по одному на интервал) с абсолютным временем в часах:
+    start, end — границы КВД; shut_in — время остановки скважины (минимум давления
+    в интервале), от которого отсчитывается Δt; storage — участок ВСС [начало, конец] или None;
+    radial — участок радиального притока или None; boundary — участок влияния
+    границ или None; radial_derivative — средний уровень производной на участке
+    радиального притока (атм); points — число точек после остановки.
+    Участок радиального притока — самая длинная серия точек с |наклоном| не больше
+    radial_tol; ВСС — до его начала, если раньше есть точки с наклоном выше storage_slope;
+    влияние границ — после его конца. Точки ближе 2L к краям интервала не классифицируются.
+    """
+    if len(intervals) == 0 or len(as_series(data)) == 0:
+        return []
+    bounds, shut_in, segment, dt, dp, x, left, right, derivative = _bourdet(data, intervals, smoothing)
+    n = len(bounds)
+    counts = np.bincount(segment, minlength=n)
+    ends = np.cumsum(counts) - 1  # индекс последней точки интервала
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_derivative = np.log(np.where(derivative > 0, derivative, np.nan))
+    slope = _weighted_slope(log_derivative, x, left, right)
+    # У краев интервала окно обрезано, и оценки наклона смещены: такие точки не классифицируются
+    valid = (x - x[(ends - counts + 1)[segment]] >= 2 * smoothing) & (x[ends[segment]] - x >= 2 * smoothing)
+    radial = valid & (np.abs(slope) <= radial_tol)  # NaN (неположительная производная) не проходит
+
+    # Участок радиального притока — самая длинная (по ln Δt) серия таких точек в интервале
+    same_segment = segment[1:] == segment[:-1]
+    run_starts = np.flatnonzero(radial & ~np.r_[False, same_segment & radial[:-1]])
+    run_ends = np.flatnonzero(radial & ~np.r_[same_segment & radial[1:], False])
+    run_segment = segment[run_starts]
+    order = np.lexsort((x[run_ends] - x[run_starts], run_segment))
+    best = order[np.r_[run_segment[order][1:] != run_segment[order][:-1], True]] if len(order) else order
+    radial_first = np.full(n, -1)
+    radial_last = np.full(n, -1)
+    radial_first[run_segment[best]] = run_starts[best]
+    radial_last[run_segment[best]] = run_ends[best]
+    totals = np.r_[0.0, np.cumsum(np.nan_to_num(derivative))]
+
+    position = np.arange(len(dt))
+    last_valid = np.full(n, -1)
+    np.maximum.at(last_valid, segment[valid], position[valid])
+    # Точки ВСС учитываются только до начала радиального притока
+    before_radial = (radial_first[segment] < 0) | (position < radial_first[segment])
+    storage = valid & (slope > storage_slope) & before_radial
+    storage_any = np.bincount(segment, weights=storage, minlength=n) > 0
+
+    absolute = shut_in[segment] + dt
+    results = []
+    for k in range(n):
+        start, end = float(bounds[k, 0]), float(bounds[k, 1])
+        entry = {"start": start, "end": end, "shut_in": float(shut_in[k]), "storage": None, "radial": None, "boundary": None,
+                 "radial_derivative": None, "points": int(counts[k])}
+        if radial_first[k] >= 0:
+            radial_start = float(absolute[radial_first[k]])
+            radial_end = float(absolute[radial_last[k]])
+            entry["radial"] = [radial_start, radial_end]
+            first, last = radial_first[k], radial_last[k]
+            entry["radial_derivative"] = float((totals[last + 1] - totals[first]) / (last - first + 1))
+            if storage_any[k]:
+                entry["storage"] = [entry["shut_in"], radial_start]
+            if radial_last[k] < last_valid[k]:
+                entry["boundary"] = [radial_end, end]
+        elif storage_any[k]:
+            entry["storage"] = [entry["shut_in"], end]
+        results.append(entry)
+    return results
@@ -0,0 +1,35 @@
+import numpy as np
+
+
+def minmax_indices(x, ys, n_buckets, keep_x=()):
+    """
+    Отбирает индексы точек для отрисовки ряда шириной n_buckets пикселей.
+
+    Ось x делится на n_buckets равных по времени корзин; в каждой корзине сохраняются
+    первая точка и точки минимума и максимума каждого ряда из ys, поэтому пики и
+    выбросы не теряются. Дополнительно сохраняются точки по обе стороны от каждого
+    значения keep_x (например, границ интервалов). x должен быть отсортирован.
+    Возвращает отсортированный массив индексов.
+    """
+    n = len(x)
+    if n <= 2 * (len(ys) + 1) * n_buckets:
+        return np.arange(n)
+
+    span = x[-1] - x[0]
+    bucket_starts = np.unique(np.searchsorted(x, x[0] + span * np.arange(n_buckets) / n_buckets))
+    bucket_ids = np.repeat(np.arange(len(bucket_starts)), np.diff(np.append(bucket_starts, n)))
+
+    keep = [bucket_starts, [n - 1]]
+    for y in ys:
+        y = np.asarray(y)
+        for reduce in (np.fmin, np.fmax):
+            extreme = reduce.reduceat(y, bucket_starts)
+            hits = np.flatnonzero(y == extreme[bucket_ids])
+            # Первая точка экстремума в каждой корзине
+            _, first = np.unique(bucket_ids[hits], return_index=True)
+            keep.append(hits[first])
+
+    edges = np.searchsorted(x, np.asarray(keep_x, dtype=float))
+    keep.append(np.clip(np.concatenate((edges - 1, edges)), 0, n - 1))
+    return np.unique(np.concatenate(keep).astype(int))
+
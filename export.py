@@ -0,0 +1,216 @@
+"""
+Возобновляемая выгрузка результатов по всем скважинам.
+
+Результат каждой скважины дописывается в выходной CSV сразу после обработки, а в
+манифест (<output>.manifest.jsonl) добавляется отметка: хэш файла данных, хэш
+параметров обнаружения и размер выходного файла после записи строки. При повторном
+запуске скважины, у которых не изменились ни файл, ни параметры, пропускаются;
+недописанный хвост выходного файла после сбоя отрезается по последней отметке.
+В конце выходной файл уплотняется: остается одна (последняя) строка на скважину.
+Выходной файл без манифеста (например, от прежней выгрузки) не перезаписывается,
+если не указан --force. С --no-scores истинная разметка не читается.
+С параметром --store обработанные скважины также записываются в хранилище
+результатов (store.py) как один прогон.
+
+    python export.py --output submission.csv --store results.db
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import pandas as pd
+from config import WORKERS
+from data_processor import DataProcessor
+from ingest import file_digest
+from store import ResultStore
+
+SCORE_COLUMNS = ["f1_recovery", "f1_drop"]
+
+
+def params_digest(detect_params):
+    """
+    Хэш параметров обнаружения (не зависит от порядка ключей).
+    """
+    text = json.dumps(detect_params, sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode(), digest_size=10).hexdigest()
+
+
+def format_intervals(intervals):
+    """
+    Интервалы в виде строки "[[начало, конец], ...]", которую читает safe_parse_intervals.
+    """
+    return json.dumps([[float(start), float(end)] for start, end in intervals])
+
+
+class ExportManifest:
+    """
+    Журнал выгруженных скважин: по одной JSON-строке на запись, последняя запись файла действует.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # недописанная строка после сбоя
+                    self.entries[entry["file"]] = entry
+
+    @property
+    def committed_size(self):
+        """
+        Размер выходного файла после последней подтвержденной строки.
+        """
+        return max((entry["offset"] for entry in self.entries.values()), default=0)
+
+    def is_done(self, filename, stamp, params_hash):
+        entry = self.entries.get(filename)
+        return (entry is not None and entry["status"] == "done" and entry["params"] == params_hash
+                and entry["digest"] == stamp["digest"])
+
+    def stamp(self, file_path, filename):
+        """
+        Размер, время изменения и хэш файла данных; хэш пересчитывается только при изменении файла.
+        """
+        stat = os.stat(file_path)
+        stamp = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        entry = self.entries.get(filename)
+        if entry is not None and entry["size"] == stamp["size"] and entry["mtime_ns"] == stamp["mtime_ns"]:
+            stamp["digest"] = entry["digest"]
+        else:
+            stamp["digest"] = file_digest(file_path)
+        return stamp
+
+    def append(self, f, entry):
+        self.entries[entry["file"]] = entry
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+
+    def rewrite(self, offset):
+        """
+        Перезаписывает манифест после уплотнения выходного файла.
+        """
+        _write_atomic(self.path, "".join(json.dumps(dict(entry, offset=offset)) + "\n"
+                                         for entry in self.entries.values()))
+
+
+def _write_atomic(path, text):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _compact(output, columns, filenames):
+    """
+    Оставляет в выходном файле последнюю строку каждой из скважин filenames, по порядку имен.
+    """
+    table = pd.read_csv(output, dtype={"file": str})
+    table = table.drop_duplicates("file", keep="last")
+    table = table[table["file"].isin(filenames)].sort_values("file")
+    _write_atomic(output, table[columns].to_csv(index=False))
+    return os.path.getsize(output)
+
+
+def export_submission(data_dir, intervals_dir, output="submission.csv", detect_params={}, workers=None,
+                      with_scores=True, processor=None, store=None, force=False):
+    """
+    Обрабатывает все скважины из data_dir и выгружает интервалы (и оценки F1) в output.
+
+    Уже выгруженные скважины с неизменными файлом и параметрами пропускаются. При
+    with_scores=False выполняется только обнаружение, истинная разметка не нужна.
+    Если output уже содержит строки, но манифеста нет, выбрасывается FileExistsError;
+    force=True разрешает перезаписать такой файл. Если задан
+    store (путь к базе или ResultStore), обработанные скважины записываются в него как
+    новый прогон; каждая — до отметки в манифесте, поэтому после сбоя ничего не теряется.
+    Возвращает словарь с числом обработанных, пропущенных и завершившихся ошибкой скважин.
+    """
+    processor = processor or DataProcessor(data_dir, intervals_dir)
+    columns = ["file", "recovery", "drop"] + (SCORE_COLUMNS if with_scores else [])
+    manifest_path = output + ".manifest.jsonl"
+    params_hash = params_digest(detect_params)
+
+    if not os.path.exists(output) and os.path.exists(manifest_path):
+        os.remove(manifest_path)  # выходной файл удален — начинаем заново
+    manifest = ExportManifest(manifest_path)
+
+    if os.path.exists(output):
+        with open(output, "rb") as f:
+            header = f.readline().decode().rstrip("\r\n").split(",")
+        if header != columns:
+            raise ValueError(f"Колонки {output} ({header}) не совпадают с выгружаемыми ({columns})")
+        header_size = len(",".join(columns)) + 1
+        if not manifest.entries and os.path.getsize(output) > header_size and not force:
+            raise FileExistsError(f"{output} уже содержит результаты, но манифеста {manifest_path} нет; "
+                                  f"удалите файл или запустите с --force, чтобы перезаписать его")
+        # Строки, записанные после последней отметки манифеста, не подтверждены
+        with open(output, "r+b") as f:
+            f.truncate(max(manifest.committed_size, header_size))
+
+    filenames = processor.list_files()
+    stamps = {filename: manifest.stamp(os.path.join(processor.data_dir, filename), filename)
+              for filename in filenames}
+    todo = [filename for filename in filenames if not manifest.is_done(filename, stamps[filename], params_hash)]
+    summary = {"processed": 0, "skipped": len(filenames) - len(todo), "failed": 0}
+    own_store = isinstance(store, str)
+    if own_store:
+        store = ResultStore(store)
+    run_id = None
+
+    try:
+        with open(output, "a", encoding="utf-8", newline="") as out, \
+                open(manifest_path, "a", encoding="utf-8") as log:
+            writer = csv.writer(out, lineterminator="\n")
+            if out.tell() == 0:
+                writer.writerow(columns)
+            results = processor.process_directory(todo, detect_params, workers, score=with_scores) if todo else ()
+            for result in results:
+                filename = result["file"]
+                entry = dict(stamps[filename], file=filename, params=params_hash)
+                if "error" in result:
+                    print(f"Файл: {filename}, ошибка: {result['error']}")
+                    summary["failed"] += 1
+                    manifest.append(log, dict(entry, status="error", offset=out.tell()))
+                    continue
+                row = [filename, format_intervals(result["recovery_intervals"]), format_intervals(result["drop_intervals"])]
+                if with_scores:
+                    row += [result["f1_recovery"], result["f1_drop"]]
+                writer.writerow(row)
+                out.flush()
+                if store is not None:
+                    if run_id is None:
+                        run_id = store.start_run(params_hash, label=output)
+                    store.add_wells(run_id, [dict(result, digest=entry["digest"])])
+                summary["processed"] += 1
+                manifest.append(log, dict(entry, status="done", offset=out.tell()))
+    finally:
+        if own_store:
+            store.close()
+    manifest.rewrite(_compact(output, columns, filenames))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Выгрузка интервалов КВД/КПД по всем скважинам")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--intervals-dir", default="true_intervals")
+    parser.add_argument("--output", default="submission.csv")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--no-scores", action="store_true", help="не добавлять колонки F1-score")
+    parser.add_argument("--store", help="файл хранилища результатов SQLite (например, results.db)")
+    parser.add_argument("--force", action="store_true", help="перезаписать выходной файл без манифеста")
+    args = parser.parse_args(argv)
+
+    summary = export_submission(args.data_dir, args.intervals_dir, args.output, workers=args.workers,
+                                with_scores=not args.no_scores, store=args.store, force=args.force)
+    print(f"Обработано: {summary['processed']}, пропущено: {summary['skipped']}, "
+          f"с ошибкой: {summary['failed']}. Результаты сохранены в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
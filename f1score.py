@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
-from sklearn.metrics import f1_score
+from metrics import stage
+from series import WellSeries
 
 def calculate_mae(true_intervals, pred_intervals):
     """
@@ -19,39 +20,83 @@ def calculate_mae(true_intervals, pred_intervals):
     return mae / count if count > 0 else 0
 
 
+def _label_bounds(time, intervals, time_tolerance):
+    """
+    Переводит интервалы времени в границы [start_idx, end_idx) по индексам выборки.
+    """
+    bounds = np.asarray(intervals, dtype=float).reshape(-1, 2)
+    start_idx = np.searchsorted(time, bounds[:, 0] - time_tolerance)
+    end_idx = np.searchsorted(time, bounds[:, 1] + time_tolerance)
+    return start_idx, end_idx
+
+
+def _covered_length(start_idx, end_idx):
+    """
+    Количество точек, покрытых объединением интервалов индексов [start_idx, end_idx).
+    """
+    if len(start_idx) == 0:
+        return 0
+    order = np.argsort(start_idx, kind="stable")
+    start_idx, end_idx = start_idx[order], end_idx[order]
+    reach = np.maximum.accumulate(end_idx)
+    covered_before = np.concatenate(([start_idx[0]], reach[:-1]))
+    return int(np.maximum(0, end_idx - np.maximum(start_idx, covered_before)).sum())
+
+
+def _mae_mask(true_bounds, pred_bounds, mae_threshold):
+    """
+    Маска пар (истинный, предсказанный интервал), у которых MAE не превышает порог.
+    Пары составляются по порядку, как в calculate_mae.
+    """
+    count = min(len(true_bounds), len(pred_bounds))
+    errors = np.abs(true_bounds[:count] - pred_bounds[:count]).mean(axis=1)
+    return errors <= mae_threshold
+
+
+def _f1_from_bounds(true_start, true_end, pred_start, pred_end):
+    """
+    F1-score по бинарной разметке точек: TP — пересечение покрытий, FP и FN — остатки.
+    """
+    true_length = _covered_length(true_start, true_end)
+    pred_length = _covered_length(pred_start, pred_end)
+    if true_length + pred_length == 0:
+        return 0.0
+    union_length = _covered_length(np.concatenate((true_start, pred_start)), np.concatenate((true_end, pred_end)))
+    true_positive = true_length + pred_length - union_length
+    return 2 * true_positive / (true_length + pred_length)
+
+
 def calculate_f1_score(true_intervals, pred_intervals, data, time_tolerance=0.08333, mae_threshold=0.15):
     """
-    Вычисляет F1-score для обнаружения интервалов, переводя интервалы в бинарные метки,
+    Вычисляет F1-score для обнаружения интервалов по бинарной разметке точек,
     с фильтрацией true positive на основе MAE.
+
+    Метки точек не создаются: TP, FP и FN считаются по длинам пересечений интервалов,
+    переведенных в индексы выборки.
     """
-    true_labels = np.zeros(len(data))
-    pred_labels = np.zeros(len(data))
+    return calculate_f1_scores(true_intervals, [pred_intervals], data, time_tolerance, mae_threshold)[0]
 
-    # Фильтруем интервалы с MAE > mae_threshold
-    filtered_true_intervals = []
-    filtered_pred_intervals = []
 
-    for true, pred in zip(true_intervals, pred_intervals):
-        mae = calculate_mae([true], [pred])
-
-        if mae <= mae_threshold:
-            filtered_true_intervals.append(true)
-            filtered_pred_intervals.append(pred)
-
-    # Создаем бинарные метки для истинных интервалов
-    for interval in filtered_true_intervals:
-        start_idx = np.searchsorted(data["Время (часы)"], interval[0] - time_tolerance)
-        end_idx = np.searchsorted(data["Время (часы)"], interval[1] + time_tolerance)
-        true_labels[start_idx:end_idx] = 1
-
-    # Создаем бинарные метки для предсказанных интервалов
-    for interval in filtered_pred_intervals:
-        start_idx = np.searchsorted(data["Время (часы)"], interval[0] - time_tolerance)
-        end_idx = np.searchsorted(data["Время (часы)"], interval[1] + time_tolerance)
-        pred_labels[start_idx:end_idx] = 1
-
-    # Вычисляем F1-score
-    return f1_score(true_labels, pred_labels)
+def calculate_f1_scores(true_intervals, pred_intervals_list, data, time_tolerance=0.08333, mae_threshold=0.15):
+    """
+    Вычисляет F1-score для нескольких вариантов предсказанных интервалов относительно
+    одной и той же истинной разметки. Возвращает массив оценок в порядке предсказаний.
+    data — WellSeries или DataFrame (используется только колонка времени).
+    """
+    time = data.time if isinstance(data, WellSeries) else np.asarray(data["Время (часы)"])
+    with stage("f1score.calculate_f1_score", len(time)):
+        true_bounds = np.asarray(true_intervals, dtype=float).reshape(-1, 2)
+        true_start, true_end = _label_bounds(time, true_bounds, time_tolerance)
+
+        scores = np.zeros(len(pred_intervals_list))
+        for i, pred_intervals in enumerate(pred_intervals_list):
+            pred_bounds = np.asarray(pred_intervals, dtype=float).reshape(-1, 2)
+            # Фильтруем интервалы с MAE > mae_threshold
+            keep = _mae_mask(true_bounds, pred_bounds, mae_threshold)
+            pred_start, pred_end = _label_bounds(time, pred_bounds[:len(keep)][keep], time_tolerance)
+            scores[i] = _f1_from_bounds(true_start[:len(keep)][keep], true_end[:len(keep)][keep],
+                                        pred_start, pred_end)
+    return scores
 
 
 # Запись результатов в CSV
@@ -1,13 +1,6 @@
-import pandas as pd
-from fin_rez import final_results
+from config import WORKERS
+from export import export_submission
 
-final_submission = []
-for result in final_results:
-    final_submission.append({
-        "file": result["file"],
-        "recovery": result["recovery_intervals"],
-        "drop": result["drop_intervals"]
-    })
-
-final_submission_df = pd.DataFrame(final_submission)
-final_submission_df.to_csv("final_submission.csv", index=False)
+# Интервалы дописываются в файл по мере обработки; уже выгруженные скважины при повторном запуске пропускаются
+summary = export_submission("data", "true_intervals", "final_submission.csv", workers=WORKERS, with_scores=False)
+print(f"Обработано: {summary['processed']}, пропущено: {summary['skipped']}, с ошибкой: {summary['failed']}")
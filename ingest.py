@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from config import INGEST_CACHE_DIR, INGEST_CACHE_MAX_BYTES
+from series import COLUMNS, WellSeries
+
+_COLUMN_FILES = ["time.npy", "pressure.npy"]
+
+
+def file_digest(file_path, block_size=1 << 20):
+    """
+    Вычисляет хэш содержимого файла (BLAKE2b), читая его блоками.
+    """
+    with open(file_path, "rb") as f:
+        return stream_digest(f, block_size)
+
+
+def stream_digest(stream, block_size=1 << 20):
+    """
+    Вычисляет хэш содержимого открытого бинарного потока, читая его блоками.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for block in iter(lambda: stream.read(block_size), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_csv(file_path):
+    """
+    Разбирает CSV-файл скважины и возвращает массивы времени и давления.
+    Колонки берутся по позиции.
+    """
+    data = pd.read_csv(file_path, usecols=[0, 1])
+    return data.iloc[:, 0].to_numpy(dtype=float), data.iloc[:, 1].to_numpy(dtype=float)
+
+
+class IngestCache:
+    """
+    Бинарный кэш колонок время/давление для CSV-файлов скважин.
+
+    После первого разбора колонки сохраняются в виде .npy-файлов в директории,
+    названной по хэшу содержимого CSV. Последующие загрузки отображают их в память
+    (mmap) без копирования. Чтобы не хэшировать файл при каждом обращении, для каждого
+    пути хранится отметка (размер, время изменения, хэш): при её несовпадении файл
+    хэшируется заново, а устаревшая запись удаляется. При превышении max_bytes
+    вытесняются давно не использовавшиеся записи.
+    """
+
+    def __init__(self, cache_dir=INGEST_CACHE_DIR, max_bytes=INGEST_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries_dir = os.path.join(cache_dir, "entries")
+        self._stamps_dir = os.path.join(cache_dir, "stamps")
+        os.makedirs(self._entries_dir, exist_ok=True)
+        os.makedirs(self._stamps_dir, exist_ok=True)
+
+    def load(self, file_path):
+        """
+        Возвращает массивы (время, давление) для CSV-файла, по возможности из кэша.
+        """
+        digest = self._digest(file_path)
+        entry = os.path.join(self._entries_dir, digest)
+        try:
+            arrays = self._open_entry(entry)
+        except (FileNotFoundError, ValueError):
+            arrays = None
+        if arrays is None:
+            self._store(entry, *parse_csv(file_path))
+            arrays = self._open_entry(entry)
+            self.evict(keep=entry)
+        else:
+            try:
+                os.utime(entry)  # отметка последнего использования для вытеснения
+            except FileNotFoundError:
+                pass  # запись уже вытеснена другим процессом; открытые массивы остаются доступны
+        return arrays
+
+    def load_frame(self, file_path):
+        """
+        Возвращает DataFrame с колонками COLUMNS поверх отображенных в память массивов.
+        """
+        time, pressure = self.load(file_path)
+        return pd.DataFrame({COLUMNS[0]: time, COLUMNS[1]: pressure}, copy=False)
+
+    def load_series(self, file_path, dtype=np.float64):
+        """
+        Возвращает WellSeries; при dtype=np.float64 — поверх отображенных в память массивов.
+        """
+        return WellSeries(*self.load(file_path), dtype=dtype)
+
+    def evict(self, keep=None):
+        """
+        Удаляет давно не использовавшиеся записи, пока размер кэша превышает max_bytes.
+        Запись keep (только что созданная) не удаляется.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self._entries_dir):
+            path = os.path.join(self._entries_dir, name)
+            if name.startswith("."):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                mtime = os.path.getmtime(path)
+            except FileNotFoundError:
+                # Запись удалена параллельным процессом
+                continue
+            entries.append((mtime, size, path))
+            total += size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def _digest(self, file_path):
+        stat = os.stat(file_path)
+        key = hashlib.blake2b(os.path.abspath(file_path).encode(), digest_size=20).hexdigest()
+        stamp_path = os.path.join(self._stamps_dir, key + ".json")
+        stamp = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        try:
+            with open(stamp_path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            saved = None
+        if saved is not None and saved["size"] == stamp["size"] and saved["mtime_ns"] == stamp["mtime_ns"]:
+            return saved["digest"]
+
+        stamp["digest"] = file_digest(file_path)
+        if saved is not None and saved["digest"] != stamp["digest"]:
+            # Файл изменился: запись со старым содержимым больше не нужна
+            shutil.rmtree(os.path.join(self._entries_dir, saved["digest"]), ignore_errors=True)
+        _write_atomic(stamp_path, json.dumps(stamp))
+        return stamp["digest"]
+
+    @staticmethod
+    def _open_entry(entry):
+        return tuple(np.load(os.path.join(entry, name), mmap_mode="r") for name in _COLUMN_FILES)
+
+    def _store(self, entry, time, pressure):
+        tmp_dir = tempfile.mkdtemp(dir=self._entries_dir, prefix=".tmp-")
+        for name, values in zip(_COLUMN_FILES, (time, pressure)):
+            np.save(os.path.join(tmp_dir, name), values)
+        try:
+            os.replace(tmp_dir, entry)
+        except OSError:
+            # Запись уже создана параллельным процессом
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _write_atomic(path, text):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+_default_cache = None
+
+
+def _cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = IngestCache()
+    return _default_cache
+
+
+def load_well(file_path):
+    """
+    Загружает CSV-файл скважины через общий бинарный кэш и возвращает DataFrame
+    с колонками "Время (часы)" и "Давление (атм)".
+    """
+    return _cache().load_frame(file_path)
+
+
+def load_series(file_path, dtype=np.float64):
+    """
+    Загружает CSV-файл скважины через общий бинарный кэш и возвращает WellSeries.
+    """
+    return _cache().load_series(file_path, dtype)
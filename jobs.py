@@ -0,0 +1,250 @@
+import json
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+
+class QueueFullError(Exception):
+    """
+    Очередь задач заполнена: новую задачу нужно отправить позже.
+    """
+
+
+def process_pool(max_workers):
+    """
+    Пул процессов, порождаемых через forkserver (spawn, где его нет), а не fork:
+    fork многопоточного процесса (рабочий процесс gthread, пул потоков построения)
+    может унаследовать захваченные другими потоками блокировки и зависнуть.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(method))
+
+
+def _write_json(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _run_job(state_path, fn, args):
+    """
+    Выполняется в процессе пула: отмечает задачу как выполняющуюся и вызывает fn(*args).
+    """
+    if state_path is not None:
+        try:
+            with open(state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            _write_json(state_path, dict(state, state="running"))
+        except (FileNotFoundError, ValueError):
+            pass
+    return fn(*args)
+
+
+class JobQueue:
+    """
+    Ограниченная очередь фоновых задач поверх пула процессов.
+
+    submit() сразу возвращает идентификатор задачи, а работа выполняется в пуле.
+    Если незавершенных задач уже max_pending, submit() выбрасывает QueueFullError
+    (обратное давление). Место под несколько задач (пакет) резервируется заранее
+    через reserve(). Хранятся сведения о последних max_finished завершенных задачах.
+
+    Если задан state_dir, состояние каждой задачи (<id>.json) и результат (<id>.pkl)
+    записываются в эту директорию, и status()/result() находят по ним задачи, поставленные
+    другими процессами (несколько рабочих процессов веб-сервера). Очередь и ограничение
+    max_pending у каждого процесса свои. Файлы старше state_ttl секунд (в том числе
+    оставшиеся от других и завершившихся процессов) удаляются при создании очереди
+    и затем не реже раза в час.
+    """
+
+    def __init__(self, workers=2, max_pending=16, max_finished=256, executor_factory=process_pool, state_dir=None,
+                 state_ttl=24 * 3600):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.state_dir = state_dir
+        self.state_ttl = state_ttl
+        self._next_cleanup = 0.0
+        self._executor_factory = executor_factory
+        self._executor = None
+        self._jobs = OrderedDict()  # идентификатор -> сведения о задаче
+        self._pending = 0
+        self._lock = threading.Lock()
+        if state_dir is not None:
+            os.makedirs(state_dir, exist_ok=True)
+            self._cleanup()
+
+    def reserve(self, count):
+        """
+        Резервирует место под count задач сразу или выбрасывает QueueFullError.
+        Зарезервированные задачи ставятся через submit(..., reserved=True);
+        неиспользованный резерв возвращается через release().
+        """
+        with self._lock:
+            if self._pending + count > self.max_pending:
+                raise QueueFullError(f"В очереди уже {self._pending} задач, нужно место еще для {count}")
+            self._pending += count
+
+    def release(self, count):
+        with self._lock:
+            self._pending -= count
+
+    def submit(self, fn, *args, on_done=None, reserved=False):
+        """
+        Ставит fn(*args) в очередь и возвращает идентификатор задачи.
+        on_done(result) вызывается после успешного завершения.
+        reserved=True — задача занимает место, зарезервированное через reserve().
+        """
+        with self._lock:
+            if not reserved and self._pending >= self.max_pending:
+                raise QueueFullError(f"В очереди уже {self._pending} задач")
+            if self._executor is None:
+                self._executor = self._executor_factory(max_workers=self.workers)
+            job_id = uuid.uuid4().hex
+            submitted = time.time()
+            state_path = self._path(job_id, ".json")
+            if state_path is not None:
+                _write_json(state_path, {"id": job_id, "state": "queued", "submitted": submitted, "finished": None})
+            future = self._executor.submit(_run_job, state_path, fn, args)
+            self._jobs[job_id] = {"future": future, "submitted": submitted, "finished": None}
+            if not reserved:
+                self._pending += 1
+            self._trim()
+        future.add_done_callback(lambda f: self._finish(job_id, f, on_done))
+        return job_id
+
+    def status(self, job_id):
+        """
+        Возвращает состояние задачи (queued, running, done, failed) или None для неизвестной задачи.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return self._load_state(job_id)
+        future = job["future"]
+        if not future.done():
+            state = "running" if future.running() else "queued"
+        elif future.exception() is not None:
+            state = "failed"
+        else:
+            state = "done"
+        status = {"id": job_id, "state": state, "submitted": job["submitted"], "finished": job["finished"]}
+        if state == "failed":
+            exc = future.exception()
+            status["error"] = f"{type(exc).__name__}: {exc}"
+        return status
+
+    def result(self, job_id):
+        """
+        Возвращает результат завершенной задачи (или выбрасывает её исключение).
+        Задача другого процесса читается из state_dir.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job["future"].result(timeout=0)
+        status = self._load_state(job_id)
+        if status is None:
+            raise KeyError(job_id)
+        if status["state"] != "done":
+            raise RuntimeError(status.get("error") or f"Задача {job_id} не завершена")
+        with open(self._path(job_id, ".pkl"), "rb") as f:
+            return pickle.load(f)
+
+    def stats(self):
+        with self._lock:
+            return {"pending": self._pending, "tracked": len(self._jobs),
+                    "workers": self.workers, "max_pending": self.max_pending}
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _path(self, job_id, suffix):
+        if self.state_dir is None:
+            return None
+        return os.path.join(self.state_dir, job_id + suffix)
+
+    def _load_state(self, job_id):
+        path = self._path(job_id, ".json")
+        if path is None or not job_id.isalnum():
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _finish(self, job_id, future, on_done):
+        finished = time.time()
+        with self._lock:
+            self._pending -= 1
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["finished"] = finished
+        ok = not future.cancelled() and future.exception() is None
+        try:
+            if on_done is not None and ok:
+                on_done(future.result())
+        finally:
+            # Даже если on_done завершился ошибкой, другие процессы должны увидеть итог задачи
+            self._persist(job_id, future, ok, finished)
+
+    def _persist(self, job_id, future, ok, finished):
+        """
+        Записывает результат и итоговое состояние задачи в state_dir (результат — раньше состояния).
+        """
+        if self.state_dir is None:
+            return
+        status = self.status(job_id) or {"id": job_id, "submitted": None}
+        status.update(finished=finished, state="done" if ok else "failed")
+        if ok:
+            fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(future.result(), f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self._path(job_id, ".pkl"))
+            except Exception as exc:
+                os.remove(tmp_path)
+                status.update(state="failed", error=f"Результат не сохранен: {type(exc).__name__}: {exc}")
+        elif "error" not in status:
+            status["error"] = "Задача отменена"
+        _write_json(self._path(job_id, ".json"), status)
+
+    def _trim(self):
+        """
+        Забывает самые старые завершенные задачи сверх max_finished (и удаляет их файлы состояния).
+        """
+        finished = [job_id for job_id, job in self._jobs.items() if job["future"].done()]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+            for suffix in (".json", ".pkl"):
+                path = self._path(job_id, suffix)
+                if path is not None and os.path.exists(path):
+                    os.remove(path)
+        if self.state_dir is not None and time.time() >= self._next_cleanup:
+            self._cleanup()
+
+    def _cleanup(self):
+        """
+        Удаляет из state_dir файлы старше state_ttl, кроме файлов незавершенных задач этого процесса.
+        """
+        now = time.time()
+        self._next_cleanup = now + min(self.state_ttl, 3600)
+        active = {job_id for job_id, job in self._jobs.items() if not job["future"].done()}
+        with os.scandir(self.state_dir) as entries:
+            for entry in entries:
+                try:
+                    if now - entry.stat().st_mtime > self.state_ttl and entry.name.split(".")[0] not in active:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    pass  # удален другим процессом
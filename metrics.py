@@ -0,0 +1,213 @@
+"""
+Легковесные замеры времени по этапам обработки.
+
+Этапы размечаются контекстным менеджером stage(name, size). Для каждого этапа
+накапливаются число вызовов, суммарное и максимальное время, суммарный размер
+входных данных и (если включено отслеживание памяти через tracemalloc) пиковая
+память. Когда замеры выключены, stage() возвращает общий пустой объект, поэтому
+накладные расходы сводятся к одной проверке флага.
+
+Статистика доступна в текстовом формате Prometheus (render_prometheus) и в виде
+структурированных JSON-записей журнала (log_summary).
+"""
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from config import METRICS_ENABLED, METRICS_TRACE_MEMORY
+
+_enabled = METRICS_ENABLED
+_trace_memory = False
+_stats = {}  # этап -> [вызовы, сумма секунд, максимум секунд, сумма размеров, пик памяти]
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def enable(trace_memory=False):
+    """
+    Включает замеры; trace_memory=True дополнительно включает tracemalloc.
+    """
+    global _enabled, _trace_memory
+    _enabled = True
+    _trace_memory = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global _enabled, _trace_memory
+    _enabled = False
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _trace_memory = False
+
+
+def is_enabled():
+    return _enabled
+
+
+class _Stage:
+    __slots__ = ("name", "size", "start")
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+    def __enter__(self):
+        if _trace_memory:
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        peak = tracemalloc.get_traced_memory()[1] if _trace_memory else None
+        record(self.name, seconds, self.size, peak)
+        return False
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP = _NoopStage()
+
+
+def stage(name, size=None):
+    """
+    Контекстный менеджер для замера этапа name; size — размер входных данных (например, число точек).
+    При вложенных этапах пик памяти внешнего этапа учитывается только после окончания внутреннего.
+    """
+    if not _enabled:
+        return _NOOP
+    return _Stage(name, size)
+
+
+def record(name, seconds, size=None, peak_bytes=None):
+    """
+    Учитывает один замер этапа. Внутри capture() замер попадает в перехваченный список.
+    """
+    sink = getattr(_local, "sink", None)
+    if sink is not None:
+        sink.append((name, seconds, size, peak_bytes))
+        return
+    with _lock:
+        entry = _stats.get(name)
+        if entry is None:
+            entry = _stats[name] = [0, 0.0, 0.0, 0, 0]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        entry[3] += size or 0
+        if peak_bytes is not None:
+            entry[4] = max(entry[4], peak_bytes)
+
+
+@contextmanager
+def capture():
+    """
+    Перехватывает замеры текущего потока в список вместо общей статистики.
+    Используется в дочерних процессах: список возвращается родителю и учитывается через merge().
+    Замеры в других потоках попадают в список, если их функции обернуты в propagate().
+    """
+    records = []
+    previous = getattr(_local, "sink", None)
+    _local.sink = records
+    try:
+        yield records
+    finally:
+        _local.sink = previous
+
+
+def propagate(fn):
+    """
+    Оборачивает fn для выполнения в другом потоке (пул потоков): ее замеры попадают
+    туда же, куда замеры вызывающего потока, — в список capture(), если он активен.
+    """
+    sink = getattr(_local, "sink", None)
+    if sink is None:
+        return fn
+
+    def bound(*args, **kwargs):
+        previous = getattr(_local, "sink", None)
+        _local.sink = sink  # list.append потокобезопасен
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.sink = previous
+    return bound
+
+
+def merge(records):
+    """
+    Учитывает замеры, полученные из capture() (например, из дочернего процесса).
+    """
+    for name, seconds, size, peak_bytes in records or ():
+        record(name, seconds, size, peak_bytes)
+
+
+def snapshot():
+    """
+    Копия накопленной статистики: {этап: {calls, seconds, max_seconds, items, peak_bytes}}.
+    """
+    with _lock:
+        return {
+            name: {"calls": calls, "seconds": seconds, "max_seconds": max_seconds,
+                   "items": items, "peak_bytes": peak_bytes}
+            for name, (calls, seconds, max_seconds, items, peak_bytes) in sorted(_stats.items())
+        }
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def render_prometheus(extra_gauges=None, extra_counters=None):
+    """
+    Статистика этапов в текстовом формате Prometheus.
+    extra_gauges и extra_counters — дополнительные метрики {имя: значение}; имена
+    счетчиков должны оканчиваться на _total.
+    """
+    stats = snapshot()
+    series = [
+        ("siam_stage_calls_total", "counter", "Число выполнений этапа", "calls"),
+        ("siam_stage_seconds_total", "counter", "Суммарное время этапа, секунды", "seconds"),
+        ("siam_stage_seconds_max", "gauge", "Максимальное время одного выполнения этапа, секунды", "max_seconds"),
+        ("siam_stage_items_total", "counter", "Суммарный размер входных данных этапа", "items"),
+    ]
+    if _trace_memory:
+        series.append(("siam_stage_peak_bytes", "gauge", "Пиковая память этапа (tracemalloc), байты", "peak_bytes"))
+
+    lines = []
+    for metric, kind, help_text, key in series:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, entry in stats.items():
+            lines.append(f'{metric}{{stage="{name}"}} {entry[key]}')
+    for kind, extra in (("counter", extra_counters), ("gauge", extra_gauges)):
+        for metric, value in (extra or {}).items():
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def log_summary(logger=None):
+    """
+    Записывает статистику каждого этапа в журнал отдельной JSON-строкой.
+    """
+    logger = logger or logging.getLogger("metrics")
+    for name, entry in snapshot().items():
+        logger.info(json.dumps(dict(entry, stage=name), ensure_ascii=False))
+
+
+if METRICS_TRACE_MEMORY:
+    enable(trace_memory=True)
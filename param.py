@@ -1,26 +1,6 @@
-from sklearn.model_selection import ParameterGrid
-import numpy as np
-import pandas as pd
-from search import detect_patterns
-from f1score import calculate_f1_score
-from utils import safe_parse_intervals
-
-def evaluate_parameters(data, true_recovery, true_drop, params):
-    """
-    Оценивает качество алгоритма (средний F1-score) для заданных параметров.
-    """
-    recovery_intervals, drop_intervals = detect_patterns(data, **params)
-    f1_recovery = calculate_f1_score(true_recovery, recovery_intervals, data)
-    f1_drop = calculate_f1_score(true_drop, drop_intervals, data)
-    return (f1_recovery + f1_drop) / 2
-
-# Загрузка данных для подбора параметров
-real_data = pd.read_csv("real_well_data.csv")
-real_data.columns = ["Время (часы)", "Давление (атм)"]
-
-true_intervals = pd.read_csv("true_intervals.csv")
-true_recovery = safe_parse_intervals(true_intervals["recovery"].iloc[0])
-true_drop = safe_parse_intervals(true_intervals["drop"].iloc[0])
+import logging
+from config import WORKERS
+from tuning import tune
 
 # Определение диапазонов параметров
 param_grid = {
@@ -33,13 +13,16 @@ param_grid = {
     'low_density_threshold': [10]
 }
 
-best_score = 0
-best_params = {}
-for params in ParameterGrid(param_grid):
-    score = evaluate_parameters(real_data, true_recovery, true_drop, params)
-    if score > best_score:
-        best_score = score
-        best_params = params
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Подбор параметров по всем скважинам из папки data с отсечением плохих конфигураций
+    tuning_result = tune("data", "true_intervals", param_grid, workers=WORKERS)
+
+    print("Лучшие параметры:", tuning_result["best_params"])
+    print("Лучший F1-score:", tuning_result["best_score"])
+    for file, score in tuning_result["per_well"].items():
+        print(f"Файл: {file}, F1-score: {score}")
+
 
-print("Лучшие параметры:", best_params)
-print("Лучший F1-score:", best_score)
+if __name__ == "__main__":
+    main()
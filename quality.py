@@ -0,0 +1,262 @@
+"""
+Проверка качества ряда давления перед обнаружением интервалов.
+
+detect_patterns рассчитан на чистый ряд: время возрастает, нет пропусков значений,
+повторов и разрывов записи. validate_series за один векторный проход проверяет ряд,
+исправляет то, что можно исправить, и делит его на непрерывные участки:
+
+- точки с NaN/inf во времени или давлении удаляются;
+- неупорядоченное время сортируется;
+- точки с одинаковым временем объединяются (давление усредняется);
+- шаг времени больше max_gap делит ряд на участки; по умолчанию max_gap — MAX_GAP_STEPS
+  медианных шагов ряда, поэтому порог подстраивается под частоту записи; участки короче
+  min_points (и окна сглаживания) не анализируются.
+
+Если ни один участок не подходит (ряд слишком короткий), выбрасывается ValueError.
+
+detect_segments запускает detect_patterns на каждом участке отдельно (для длинных
+рядов — в пуле потоков), поэтому интервалы и производная не захватывают разрывы.
+Решение о расширении интервалов при низкой дискретизации принимается по плотности
+точек всей скважины, как и без деления на участки.
+
+detect_stream_segments выполняет ту же проверку для потока порций (время, давление)
+и обнаруживает интервалы StreamingDetector на каждом участке.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import metrics
+from config import MAX_GAP_STEPS, MIN_SEGMENT_POINTS, SEGMENT_PARALLEL_POINTS
+from search import detect_patterns
+from series import WellSeries, as_series
+from stream import StreamingDetector, expand_low_density
+
+
+def gap_limit(step):
+    """
+    Порог разрыва по шагам времени ряда: MAX_GAP_STEPS медианных шагов.
+    """
+    return MAX_GAP_STEPS * float(np.median(step)) if len(step) else np.inf
+
+
+def _too_short(points, min_points):
+    return ValueError(f"Ряд слишком короткий для обнаружения: нет участка без разрывов из {min_points} "
+                      f"и более точек (всего точек: {points})")
+
+
+def validate_series(data, window_size=10, max_gap=None, min_points=MIN_SEGMENT_POINTS):
+    """
+    Проверяет и исправляет ряд. Возвращает (series, segments, report): исправленный
+    WellSeries, список участков [начало, конец) в индексах исправленного ряда
+    (только участки не короче min_points и окна сглаживания window_size) и словарь
+    с найденными нарушениями. max_gap — порог разрыва в часах (по умолчанию gap_limit).
+    Если нарушений нет, возвращается исходный ряд без копирования.
+    Если подходящих участков нет, выбрасывает ValueError.
+    """
+    min_points = max(min_points, window_size)
+    series = as_series(data)
+    time = series.time
+    pressure = series.pressure
+    report = {"points": len(time), "non_finite": 0, "unsorted": 0, "duplicates": 0,
+              "gaps": [], "skipped_points": 0}
+
+    finite = np.isfinite(time) & np.isfinite(pressure)
+    report["non_finite"] = int(len(finite) - np.count_nonzero(finite))
+    if report["non_finite"]:
+        time = time[finite]
+        pressure = pressure[finite]
+
+    step = np.diff(time)
+    report["unsorted"] = int(np.count_nonzero(step < 0))
+    report["duplicates"] = int(np.count_nonzero(step == 0))
+    if report["unsorted"] or report["duplicates"]:
+        # np.unique сортирует время и объединяет повторы; давление повторов усредняется
+        time, inverse, counts = np.unique(time, return_inverse=True, return_counts=True)
+        pressure = np.bincount(inverse, weights=pressure) / counts
+        report["duplicates"] = int(len(inverse) - len(time))
+        step = np.diff(time)
+    if report["non_finite"] or report["unsorted"] or report["duplicates"]:
+        series = WellSeries(time, pressure, series.dtype)
+
+    if max_gap is None:
+        max_gap = gap_limit(step)
+    gaps = np.flatnonzero(step > max_gap)
+    report["gaps"] = [[float(time[i]), float(time[i + 1])] for i in gaps]
+    bounds = np.concatenate(([0], gaps + 1, [len(time)]))
+    segments = [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end - start >= min_points]
+    if not segments:
+        raise _too_short(len(time), min_points)
+    report["skipped_points"] = len(time) - sum(end - start for start, end in segments)
+    report["segments"] = len(segments)
+    return series, segments, report
+
+
+def has_issues(report):
+    """
+    True, если при проверке ряд был исправлен, разделен или часть точек не анализируется.
+    """
+    return bool(report["non_finite"] or report["unsorted"] or report["duplicates"]
+                or report["gaps"] or report["skipped_points"])
+
+
+def point_density(series):
+    """
+    Плотность точек ряда (точек в час) для решения о расширении интервалов.
+    """
+    duration = series.time[-1] - series.time[0] if len(series) else 0
+    return len(series) / duration if duration > 0 else np.inf
+
+
+def detect_segments(data, segments, workers=None, parallel_points=SEGMENT_PARALLEL_POINTS, **detect_params):
+    """
+    detect_patterns на каждом участке ряда (результат validate_series). Возвращает то же,
+    что detect_patterns: интервалы КВД и КПД по всем участкам и производную на весь ряд
+    (вне участков — нули). Если участков несколько и в ряду не меньше parallel_points
+    точек, участки обрабатываются в пуле потоков из workers потоков.
+    """
+    series = as_series(data)
+    detect_params.setdefault("point_density", point_density(series))
+
+    def detect(segment):
+        start, end = segment
+        return detect_patterns(WellSeries(series.time[start:end], series.pressure[start:end], series.dtype),
+                               **detect_params)
+
+    if len(segments) > 1 and len(series) >= parallel_points:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(metrics.propagate(detect), segments))
+    else:
+        results = [detect(segment) for segment in segments]
+
+    recovery_intervals, drop_intervals = [], []
+    derivative = np.zeros(len(series))
+    for (start, end), (recovery, drop, segment_derivative) in zip(segments, results):
+        recovery_intervals.extend(recovery)
+        drop_intervals.extend(drop)
+        derivative[start:end] = segment_derivative
+    return recovery_intervals, drop_intervals, derivative
+
+
+class _StreamSegments:
+    """
+    Проверка потока порций и обнаружение интервалов отдельным StreamingDetector
+    на каждом непрерывном участке (см. detect_stream_segments).
+    """
+
+    def __init__(self, window_size, max_gap, min_points, detect_params):
+        self.params = dict(detect_params, window_size=window_size)
+        self.low_density_threshold = self.params.pop("low_density_threshold", 10)
+        self.max_gap = max_gap
+        self.min_points = max(min_points, window_size)
+        self.report = {"points": 0, "non_finite": 0, "unsorted": 0, "duplicates": 0,
+                       "gaps": [], "skipped_points": 0, "segments": 0}
+        self.recovery_intervals, self.drop_intervals = [], []
+        self._head = []  # порции до определения порога разрыва по медианному шагу
+        self._latest = -np.inf  # наибольшее время среди принятых точек
+        self._previous = None  # время последней точки, переданной участкам
+        self._first = None
+        self._kept = 0
+        self._detector = None
+        self._start = []  # начало участка, пока в нем меньше min_points точек
+
+    def update(self, time, pressure):
+        time = np.asarray(time, dtype=float)
+        pressure = np.asarray(pressure, dtype=float)
+        self.report["points"] += len(time)
+        finite = np.isfinite(time) & np.isfinite(pressure)
+        self.report["non_finite"] += int(len(finite) - np.count_nonzero(finite))
+        time, pressure = time[finite], pressure[finite]
+        if len(time) == 0:
+            return
+        # Точки, не продолжающие возрастание времени, отбрасываются: в потоке их нельзя переставить
+        latest = np.maximum.accumulate(np.concatenate(([self._latest], time)))[:-1]
+        self.report["unsorted"] += int(np.count_nonzero(time < latest))
+        self.report["duplicates"] += int(np.count_nonzero(time == latest))
+        keep = time > latest
+        time, pressure = time[keep], pressure[keep]
+        if len(time) == 0:
+            return
+        self._latest = time[-1]
+        if self._first is None:
+            self._first = time[0]
+        self._kept += len(time)
+
+        if self.max_gap is None:
+            self._head.append((time, pressure))
+            if sum(len(part) for part, _ in self._head) < self.min_points:
+                return
+            time, pressure = self._take_head()
+        self._split(time, pressure)
+
+    def finish(self):
+        """
+        Завершает последний участок и возвращает (интервалы КВД, интервалы КПД, отчет).
+        """
+        if self._head:
+            self._split(*self._take_head())
+        self._close()
+        if not self.report["segments"]:
+            raise _too_short(self._kept, self.min_points)
+        # Расширение при низкой дискретизации — по плотности точек всей скважины
+        duration = self._latest - self._first
+        return (expand_low_density(self.recovery_intervals, self._kept, duration, self.low_density_threshold),
+                expand_low_density(self.drop_intervals, self._kept, duration, self.low_density_threshold),
+                self.report)
+
+    def _take_head(self):
+        time = np.concatenate([part for part, _ in self._head])
+        pressure = np.concatenate([part for _, part in self._head])
+        self._head = []
+        if self.max_gap is None:
+            self.max_gap = gap_limit(np.diff(time))
+        return time, pressure
+
+    def _split(self, time, pressure):
+        step = np.diff(time, prepend=time[0] if self._previous is None else self._previous)
+        gaps = np.flatnonzero(step > self.max_gap)
+        self.report["gaps"].extend([float(time[i] - step[i]), float(time[i])] for i in gaps)
+        bounds = np.concatenate(([0], gaps, [len(time)]))
+        for k, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            if k:
+                self._close()
+            if end > start:
+                self._feed(time[start:end], pressure[start:end])
+        self._previous = time[-1]
+
+    def _feed(self, time, pressure):
+        if self._detector is not None:
+            self._collect(self._detector.update(time, pressure))
+            return
+        self._start.append((time, pressure))
+        if sum(len(part) for part, _ in self._start) >= self.min_points:
+            self._detector = StreamingDetector(expand_low_density=False, **self.params)
+            self._collect(self._detector.update(np.concatenate([part for part, _ in self._start]),
+                                                np.concatenate([part for _, part in self._start])))
+            self._start = []
+
+    def _close(self):
+        if self._detector is not None:
+            self._collect(self._detector.finish())
+            self._detector = None
+            self.report["segments"] += 1
+        self.report["skipped_points"] += sum(len(part) for part, _ in self._start)
+        self._start = []
+
+    def _collect(self, found):
+        self.recovery_intervals.extend(found[0])
+        self.drop_intervals.extend(found[1])
+
+
+def detect_stream_segments(chunks, window_size=10, max_gap=None, min_points=MIN_SEGMENT_POINTS, **detect_params):
+    """
+    Потоковый аналог validate_series + detect_segments для порций (время, давление).
+    Возвращает (интервалы КВД, интервалы КПД, отчет в формате validate_series).
+
+    Отличия от обработки целиком: точки с временем не больше уже полученного отбрасываются
+    (учитываются как unsorted и duplicates), а порог разрыва по умолчанию считается
+    по медианному шагу первых порций (не меньше min_points точек). На чистом ряду
+    результат совпадает с detect_stream. Если подходящих участков нет, выбрасывает ValueError.
+    """
+    stream = _StreamSegments(window_size, max_gap, min_points, detect_params)
+    for time, pressure in chunks:
+        stream.update(time, pressure)
+    return stream.finish()
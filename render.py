@@ -0,0 +1,216 @@
+"""
+Построение графиков без глобального состояния pyplot.
+
+Графики строятся на явных объектах Figure/FigureCanvasAgg. Каждый поток использует
+собственные шаблоны графиков, которые создаются один раз и переиспользуются: оси,
+подписи осей, заголовок и сетка остаются, а между графиками заменяются только данные
+(линии, интервалы, области, подписи и легенда). Поэтому несколько графиков могут
+строиться одновременно в потоках одного процесса (пул потоков submit).
+matplotlib импортируется при создании первого шаблона, а не при импорте модуля.
+"""
+import base64
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import metrics
+from config import PLOT_WIDTH_PX, THUMB_WIDTH_PX, RENDER_WORKERS
+from diagnostics import diagnose_recoveries
+from downsample import minmax_indices
+from series import as_series
+
+RECOVERY_COLORS = ['green', 'blue', 'orange']
+DROP_COLORS = ['red', 'purple', 'yellow']
+
+_local = threading.local()
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+class _Template:
+    """
+    Переиспользуемый график: статические элементы создаются в конструкторе,
+    временные (добавленные при построении) удаляются перед следующим построением.
+    Экземпляр используется только в одном потоке.
+    """
+
+    def __init__(self, width_px, height_in):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        self.figure = Figure(figsize=(width_px / 100, height_in), dpi=100)
+        FigureCanvasAgg(self.figure)
+        self._artists = []
+
+    def _keep(self, artist):
+        self._artists.append(artist)
+        return artist
+
+    def _clear(self):
+        for artist in self._artists:
+            artist.remove()
+        self._artists = []
+
+    def _png(self, points, **savefig_kwargs):
+        img = io.BytesIO()
+        with metrics.stage("app.savefig", points):
+            self.figure.savefig(img, format='png', **savefig_kwargs)
+        with metrics.stage("app.base64_encode", img.tell()):
+            return base64.b64encode(img.getvalue()).decode()
+
+
+class IntervalsPlot(_Template):
+    """
+    Основной график: давление, производная, интервалы КВД/КПД и области.
+    """
+
+    def __init__(self, width_px=PLOT_WIDTH_PX):
+        super().__init__(width_px, 6)
+        self.ax1 = self.figure.add_subplot()
+        self.ax1.set_xlabel("Время (часы)")
+        self.ax1.set_ylabel("Давление (атм)", color='blue')
+        self.ax1.tick_params(axis='y', labelcolor='blue')
+        self.ax1.set_title("Выделение интервалов КВД, КПД и областей на графике")
+        self.ax2 = self.ax1.twinx()
+        self.ax2.set_ylabel("Производная (атм/час)", color='red')
+        self.ax2.tick_params(axis='y', labelcolor='red')
+        self.ax2.grid()
+        self.pressure_line, = self.ax1.plot([], [], label="Давление", color='blue')
+        self.derivative_line, = self.ax2.plot([], [], label="Производная давления", color='red', linestyle='--')
+
+    def render(self, time, pressure, derivative, recovery_intervals, drop_intervals, regions=()):
+        """
+        Строит график и возвращает base64 PNG. regions — области (начало, конец, цвет, подпись).
+        """
+        with metrics.stage("render.intervals", len(time)):
+            self._draw(time, pressure, derivative, recovery_intervals, drop_intervals, regions)
+        return self._png(len(time), bbox_inches='tight')
+
+    def _draw(self, time, pressure, derivative, recovery_intervals, drop_intervals, regions):
+        from matplotlib.ticker import AutoLocator, FixedLocator
+        self._clear()
+        self.pressure_line.set_data(time, pressure)
+        self.derivative_line.set_data(time, derivative)
+
+        for idx, (start, end) in enumerate(recovery_intervals):
+            color = RECOVERY_COLORS[idx % len(RECOVERY_COLORS)]
+            self._keep(self.ax2.axvspan(start, end, color=color, alpha=0.3, label=f"КВД {idx+1}" if idx < 3 else ""))
+            self._keep(self.ax1.text((start + end) / 2, np.max(pressure), "КВД",
+                                     color=color, fontsize=12, ha='center', va='bottom'))
+        for idx, (start, end) in enumerate(drop_intervals):
+            color = DROP_COLORS[idx % len(DROP_COLORS)]
+            self._keep(self.ax2.axvspan(start, end, color=color, alpha=0.3, label=f"КПД {idx+1}" if idx < 3 else ""))
+            self._keep(self.ax1.text((start + end) / 2, np.min(pressure), "КПД",
+                                     color=color, fontsize=12, ha='center', va='top'))
+        for start, end, color, label in regions:
+            self._keep(self.ax2.axvspan(start, end, color=color, alpha=0.2, label=label))
+
+        for ax in (self.ax1, self.ax2):
+            ax.relim()
+            ax.autoscale_view()
+        # Шаг 1 час по оси времени, если делений не слишком много
+        if len(time) and time[-1] <= 48:
+            self.ax1.xaxis.set_major_locator(FixedLocator(np.arange(0, time[-1] + 1, 1)))
+        else:
+            self.ax1.xaxis.set_major_locator(AutoLocator())
+        self._keep(self.ax2.legend(loc='upper left', bbox_to_anchor=(1, 1), fontsize='small', ncol=1))
+
+
+class ThumbnailPlot(_Template):
+    """
+    Миниатюра для сводки пакета: давление и интервалы без подписей.
+    """
+
+    def __init__(self, width_px=THUMB_WIDTH_PX):
+        super().__init__(width_px, 2)
+        self.ax = self.figure.add_subplot()
+        self.ax.tick_params(labelsize=6)
+        self.line, = self.ax.plot([], [], color='blue', linewidth=0.8)
+
+    def render(self, time, pressure, recovery_intervals, drop_intervals):
+        with metrics.stage("render.thumbnail", len(time)):
+            self._clear()
+            self.line.set_data(time, pressure)
+            for start, end in recovery_intervals:
+                self._keep(self.ax.axvspan(start, end, color='green', alpha=0.3))
+            for start, end in drop_intervals:
+                self._keep(self.ax.axvspan(start, end, color='red', alpha=0.3))
+            self.ax.relim()
+            self.ax.autoscale_view()
+        return self._png(len(time), bbox_inches='tight')
+
+
+def _template(cls, width_px):
+    templates = getattr(_local, "templates", None)
+    if templates is None:
+        templates = _local.templates = {}
+    key = (cls, width_px)
+    if key not in templates:
+        templates[key] = cls(width_px)
+    return templates[key]
+
+
+def render_intervals(time, pressure, derivative, recovery_intervals, drop_intervals, regions=(),
+                     width_px=PLOT_WIDTH_PX):
+    """
+    Основной график в виде base64 PNG. Ряд прореживается до нескольких точек на пиксель
+    ширины (минимум и максимум давления и производной в каждой корзине, точки на границах
+    интервалов), поэтому время отрисовки зависит от разрешения графика, а не от длины ряда.
+    """
+    edges = [edge for interval in list(recovery_intervals) + list(drop_intervals) for edge in interval]
+    shown = minmax_indices(time, [pressure, derivative], width_px, keep_x=edges)
+    return _template(IntervalsPlot, width_px).render(time[shown], pressure[shown], derivative[shown],
+                                                     recovery_intervals, drop_intervals, regions)
+
+
+def render_thumbnail(time, pressure, recovery_intervals, drop_intervals, width_px=THUMB_WIDTH_PX):
+    """
+    Миниатюра графика давления с интервалами в виде base64 PNG.
+    """
+    shown = minmax_indices(time, [pressure], width_px)
+    return _template(ThumbnailPlot, width_px).render(time[shown], pressure[shown], recovery_intervals, drop_intervals)
+
+
+def recovery_regions(diagnostics):
+    """
+    Области режимов течения по диагностике КВД для графика: (начало, конец, цвет, подпись).
+    Подпись задается только у первой области каждого вида, чтобы легенда не повторялась.
+    """
+    regions = []
+    labeled = set()
+    for entry in diagnostics:
+        for key, color, label in (("storage", 'gray', "Влияние ствола скважины (ВСС)"),
+                                  ("radial", 'yellow', "Работа пласта"),
+                                  ("boundary", 'pink', "Влияние границ")):
+            if entry[key] is not None:
+                regions.append((entry[key][0], entry[key][1], color, label if key not in labeled else ""))
+                labeled.add(key)
+    return regions
+
+
+def plot_intervals(data, recovery_intervals, drop_intervals, derivative, diagnostics=None):
+    """
+    Строит график с интервалами КВД, КПД и областями режимов течения внутри каждой КВД
+    (по diagnose_recoveries, если диагностика не передана) и возвращает его в виде base64 PNG.
+    Не использует pyplot, поэтому может вызываться одновременно из нескольких потоков.
+    """
+    series = as_series(data)
+    if diagnostics is None:
+        diagnostics = diagnose_recoveries(series, recovery_intervals)
+    return render_intervals(series.time, series.pressure, derivative, recovery_intervals, drop_intervals,
+                            recovery_regions(diagnostics))
+
+
+def submit(fn, *args, **kwargs):
+    """
+    Выполняет построение графика в общем пуле потоков текущего процесса и возвращает Future.
+    Пул создается заново после fork (потоки в дочерний процесс не наследуются).
+    Замеры построения попадают в capture() вызывающего потока (metrics.propagate).
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+            _pool_pid = os.getpid()
+        return _pool.submit(metrics.propagate(fn), *args, **kwargs)
@@ -1,6 +1,10 @@
 import numpy as np
 import pandas as pd
-from scipy.signal import savgol_filter
+from config import (PEAK_OFFSET, RECOVERY_DURATION_POINTS, PEAK_OFFSET_HOURS, RECOVERY_DURATION_HOURS,
+                    DENSITY_CHECK_HOURS, PYRAMID_FACTOR, POLYORDER)
+from metrics import stage
+from series import as_series
+from smoothing import smooth, differentiate, savgol_kernels
 
 def check_point_density(data, start_idx, end_idx, min_points=20):
     """
@@ -28,51 +32,240 @@ def filter_intervals(intervals, min_duration):
             filtered.append(interval)
     return filtered
 
+def _noise_prefix(pressure, noise_threshold):
+    """
+    Префиксные суммы числа резких скачков давления (|Δp| > noise_threshold).
+    Разность давлений считается один раз для всего ряда, после чего наличие шума
+    в любом интервале [start, end) проверяется за O(1).
+    """
+    noisy = np.abs(np.diff(pressure)) > noise_threshold
+    return np.concatenate(([0], np.cumsum(noisy)))
+
+
+def _scan_candidates(starts, ends, time, noise_prefix, min_points, min_duration, density_ends=None):
+    """
+    Векторный аналог проверок check_point_density, check_for_noise и filter_intervals
+    для всех кандидатов сразу. Возвращает маску принятых кандидатов.
+    density_ends — индексы конца первого участка для проверки плотности (по умолчанию start + 6).
+    """
+    n = len(time)
+    inside = ends < n
+    ends_clipped = np.minimum(ends, n - 1)
+    if density_ends is None:
+        density_ends = starts + 6
+    density = (density_ends <= ends) & (ends - starts >= min_points)
+    # Скачки внутри [start, end) соответствуют индексам разностей start..end-2
+    last_diff = np.minimum(np.maximum(ends - 1, starts), n - 1)
+    noisy = noise_prefix[last_diff] - noise_prefix[starts] > 0
+    long_enough = (time[ends_clipped] - time[starts]) >= min_duration
+    return inside & density & ~noisy & long_enough
+
+
+def _merge_spans(starts, ends):
+    """
+    Объединяет пересекающиеся интервалы индексов (starts должны быть отсортированы).
+    """
+    if len(starts) == 0:
+        return starts, ends
+    reach = np.maximum.accumulate(ends)
+    group_heads = np.concatenate(([0], np.flatnonzero(starts[1:] > reach[:-1]) + 1))
+    return starts[group_heads], np.maximum.reduceat(ends, group_heads)
+
+
+def _spans_to_intervals(time, starts, ends):
+    return [[time[start], time[end]] for start, end in zip(starts, ends)]
+
+
+_TIME_EPS = 1e-9  # допуск при сравнении моментов времени (часы)
+
+
+def _time_bounds(time, targets):
+    """
+    Индексы первых точек, время которых не меньше targets (с допуском на округление).
+    """
+    return np.searchsorted(time, targets - _TIME_EPS)
+
+
+def smooth_derivative(pressure, window_size=10, time=None, smoothing="savgol_gradient", polyorder=POLYORDER):
+    """
+    Сглаживает давление и возвращает производную сглаженного ряда. Алгоритм выбирается
+    по имени smoothing (см. smoothing.BACKENDS); по умолчанию — фильтр Савицкого–Голея
+    и np.gradient. Если передано время, производная считается по реальному шагу (атм/час),
+    иначе — на точку. pressure может быть двумерным массивом скважин одинаковой длины.
+    Вычисления выполняются в float64 и для рядов float32.
+    """
+    size = np.size(pressure)
+    filter_stage = "search.savgol_filter" if smoothing.startswith("savgol") else f"search.{smoothing}_filter"
+    with stage(filter_stage, size):
+        smoothed = smooth(pressure, window_size, polyorder, smoothing)
+    with stage("search.gradient", size):
+        return differentiate(smoothed, time, smoothing)
+
+
+def _savgol_gain(window_size):
+    """
+    Максимальная сумма модулей коэффициентов фильтра Савицкого–Голея (включая краевые точки).
+    Сглаженное значение отличается от середины диапазона исходных точек окна не более чем
+    на gain * (max - min) / 2, поэтому |производная| не превосходит gain * (max - min).
+    """
+    kernel, edges = savgol_kernels(window_size, POLYORDER)
+    return max(np.abs(edges).sum(axis=1).max(), np.abs(kernel).sum())
+
+
+def _active_spans(pressure, window_size, threshold, factor=PYRAMID_FACTOR):
+    """
+    Грубый уровень пирамиды: ряд делится на блоки по factor точек, для каждого блока берется
+    размах давления по нему и соседним блокам. Блок, где gain * размах не превышает threshold,
+    гарантированно не содержит точек с |производной| > threshold и пропускается.
+    Возвращает границы [начало, конец) участков из подряд идущих активных блоков.
+    """
+    n = len(pressure)
+    factor = max(factor, window_size + 2)  # окрестность точки не выходит за соседние блоки
+    block_starts = np.arange(0, n, factor)
+    block_max = np.maximum.reduceat(pressure, block_starts)
+    block_min = np.minimum.reduceat(pressure, block_starts)
+    near_max = np.maximum(block_max, np.maximum(np.append(block_max[1:], -np.inf), np.insert(block_max[:-1], 0, -np.inf)))
+    near_min = np.minimum(block_min, np.minimum(np.append(block_min[1:], np.inf), np.insert(block_min[:-1], 0, np.inf)))
+    # NaN в блоке делает его активным: результат для такого участка считается на полном разрешении
+    active = ~(_savgol_gain(window_size) * (near_max - near_min) <= threshold)
+
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = block_starts[np.flatnonzero(edges == 1)]
+    ends = np.minimum(np.flatnonzero(edges == -1) * factor, n)
+    return starts, ends
+
+
+def pyramid_derivative(pressure, window_size=10, threshold=5.0, factor=PYRAMID_FACTOR):
+    """
+    Производная сглаженного ряда, вычисленная на полном разрешении только внутри активных
+    участков грубого уровня (с запасом в окно фильтра по краям). Вне них производная
+    заведомо не превышает threshold по модулю и заменяется нулем, поэтому набор точек
+    с |производной| > threshold совпадает с полным расчетом smooth_derivative.
+    """
+    n = len(pressure)
+    derivative = np.zeros(n)
+    pad = window_size + 2
+    with stage("search.pyramid_coarse", n):
+        starts, ends = _active_spans(pressure, window_size, threshold, factor)
+    for start, end in zip(starts, ends):
+        lo, hi = max(0, start - pad), min(n, end + pad)
+        if hi - lo < window_size:
+            lo, hi = max(0, hi - window_size), min(n, lo + window_size)
+        derivative[start:end] = smooth_derivative(pressure[lo:hi], window_size)[start - lo:end - lo]
+    return derivative
+
+
 def detect_patterns(data, window_size=10, threshold=5.0, min_points=20, noise_threshold=10.0,
-                    min_recovery_duration=4, min_drop_duration=6, low_density_threshold=10):
+                    min_recovery_duration=4, min_drop_duration=6, low_density_threshold=10, merge=True,
+                    time_windows=False, pyramid=False, smoothing="savgol_gradient", point_density=None):
     """
     Обнаруживает интервалы повышения (КВД) и понижения (КПД) давления.
+
+    Все кандидаты проверяются векторно. При merge=True пересекающиеся интервалы,
+    порождённые соседними точками одного фронта, объединяются в один; при merge=False
+    возвращается полный список кандидатов, как в исходной реализации.
+
+    При time_windows=True окна кандидатов задаются в часах (PEAK_OFFSET_HOURS,
+    RECOVERY_DURATION_HOURS, DENSITY_CHECK_HOURS) и переводятся в индексы одним
+    searchsorted, а производная считается по реальному шагу времени. Тогда threshold
+    задается в атм/час (порог 5 атм на точку при минутном шаге соответствует 300 атм/час),
+    и одинаковые параметры дают окна одной длительности при любой частоте записи.
+
+    При pyramid=True сглаживание и производная считаются на полном разрешении только
+    внутри участков, где грубый уровень (размах давления по блокам) допускает превышение
+    порога; вне них возвращаемая производная равна нулю. Найденные интервалы совпадают
+    с полным расчетом. pyramid="verify" дополнительно выполняет полный расчет и выбрасывает
+    ValueError при расхождении. Пирамида используется только с алгоритмом сглаживания
+    по умолчанию и без time_windows.
+
+    smoothing — алгоритм сглаживания и производной (см. smoothing.BACKENDS).
+
+    point_density — плотность точек (точек в час), по которой решается, расширять ли
+    интервалы при низкой дискретизации; по умолчанию — плотность переданного ряда.
+    detect_segments передает плотность всей скважины, а не отдельного участка.
+    """
+    # Сглаживаем данные и вычисляем производную сглаженных данных
+    series = as_series(data)
+    use_pyramid = pyramid and not time_windows and smoothing == "savgol_gradient"
+    if use_pyramid:
+        derivative = pyramid_derivative(series.pressure, window_size, threshold)
+    else:
+        derivative = smooth_derivative(series.pressure, window_size, series.time if time_windows else None,
+                                       smoothing)
+    recovery_intervals, drop_intervals = detect_from_derivative(
+        series, derivative, threshold, min_points, noise_threshold,
+        min_recovery_duration, min_drop_duration, low_density_threshold, merge, time_windows, point_density)
+
+    if use_pyramid and pyramid == "verify":
+        full_recovery, full_drop, _ = detect_patterns(
+            series, window_size, threshold, min_points, noise_threshold,
+            min_recovery_duration, min_drop_duration, low_density_threshold, merge,
+            point_density=point_density)
+        if not (np.array_equal(np.asarray(recovery_intervals), np.asarray(full_recovery))
+                and np.array_equal(np.asarray(drop_intervals), np.asarray(full_drop))):
+            raise ValueError("Результат многомасштабного обнаружения расходится с полным расчетом")
+    return recovery_intervals, drop_intervals, derivative
+
+
+def detect_from_derivative(data, derivative, threshold=5.0, min_points=20, noise_threshold=10.0,
+                           min_recovery_duration=4, min_drop_duration=6, low_density_threshold=10, merge=True,
+                           time_windows=False, point_density=None):
+    """
+    Обнаруживает интервалы КВД и КПД по заранее вычисленной производной.
+    Позволяет переиспользовать сглаживание при переборе остальных параметров.
+    data — WellSeries или DataFrame с колонками времени и давления.
+    point_density — см. detect_patterns.
     """
     # Извлекаем давление и время
-    pressure = data["Давление (атм)"].values
-    time = data["Время (часы)"].values
-
-    # Сглаживаем данные
-    pressure_smoothed = savgol_filter(pressure, window_size, 3)
-    # Вычисляем производную сглаженных данных
-    derivative = np.gradient(pressure_smoothed)
-
-    recovery_intervals = []
-    drop_intervals = []
-
-    # Обнаружение пиков (интервалы КВД: рост давления)
-    peaks = np.where(derivative > threshold)[0]
-    for peak in peaks:
-        start = max(0, peak - 30)
-        end = start + 4 * 60  # 4 часа, если данные с интервалом 10 минут (240 точек)
-        if end < len(data):
-            if check_point_density(data, start, end, min_points) and not check_for_noise(data, start, end,
-                                                                                         noise_threshold):
-                recovery_intervals.append([time[start], time[end]])
-
-    # Обнаружение впадин (интервалы КПД: падение давления)
-    valleys = np.where(derivative < -threshold)[0]
-    for valley in valleys:
-        start = max(0, valley - 30)
-        end = start + int(1.1 * (valley - start))  # увеличение длительности на 10%
-        if end < len(data):
-            if check_point_density(data, start, end, min_points) and not check_for_noise(data, start, end,
-                                                                                         noise_threshold):
-                drop_intervals.append([time[start], time[end]])
-
-    # Фильтрация интервалов по длительности
-    recovery_intervals = filter_intervals(recovery_intervals, min_recovery_duration)
-    drop_intervals = filter_intervals(drop_intervals, min_drop_duration)
-
-    # Если дискретизация данных низкая, немного расширяем интервалы
-    total_duration = time[-1] - time[0]
-    if len(data) / total_duration < low_density_threshold:
-        recovery_intervals = [[start - 0.1, end + 0.1] for start, end in recovery_intervals]
-        drop_intervals = [[start - 0.1, end + 0.1] for start, end in drop_intervals]
-
-    return recovery_intervals, drop_intervals, derivative
\ No newline at end of file
+    series = as_series(data)
+    pressure = series.pressure
+    time = series.time
+
+    with stage("search.candidate_scan", len(pressure)):
+        noise_prefix = _noise_prefix(pressure, noise_threshold)
+
+        # Обнаружение пиков (интервалы КВД: рост давления)
+        peaks = np.flatnonzero(derivative > threshold)
+        if time_windows:
+            starts = _time_bounds(time, time[peaks] - PEAK_OFFSET_HOURS)
+            ends = _time_bounds(time, time[starts] + RECOVERY_DURATION_HOURS)
+            density_ends = _time_bounds(time, time[starts] + DENSITY_CHECK_HOURS)
+        else:
+            starts = np.maximum(0, peaks - PEAK_OFFSET)
+            ends = starts + RECOVERY_DURATION_POINTS  # 4 часа, если данные с интервалом 1 минута (240 точек)
+            density_ends = None
+        accepted = _scan_candidates(starts, ends, time, noise_prefix, min_points, min_recovery_duration,
+                                    density_ends)
+        recovery_spans = starts[accepted], ends[accepted]
+
+        # Обнаружение впадин (интервалы КПД: падение давления)
+        valleys = np.flatnonzero(derivative < -threshold)
+        if time_windows:
+            starts = _time_bounds(time, time[valleys] - PEAK_OFFSET_HOURS)
+            # увеличение длительности на 10%
+            ends = _time_bounds(time, time[starts] + 1.1 * (time[valleys] - time[starts]))
+            density_ends = _time_bounds(time, time[starts] + DENSITY_CHECK_HOURS)
+        else:
+            starts = np.maximum(0, valleys - PEAK_OFFSET)
+            ends = starts + (1.1 * (valleys - starts)).astype(int)  # увеличение длительности на 10%
+            density_ends = None
+        accepted = _scan_candidates(starts, ends, time, noise_prefix, min_points, min_drop_duration,
+                                    density_ends)
+        drop_spans = starts[accepted], ends[accepted]
+
+    with stage("search.filter_intervals", len(pressure)):
+        # Объединение перекрывающихся кандидатов в отдельные интервалы
+        if merge:
+            recovery_spans = _merge_spans(*recovery_spans)
+            drop_spans = _merge_spans(*drop_spans)
+        recovery_intervals = _spans_to_intervals(time, *recovery_spans)
+        drop_intervals = _spans_to_intervals(time, *drop_spans)
+
+        # Если дискретизация данных низкая, немного расширяем интервалы
+        if point_density is None:
+            point_density = len(series) / (time[-1] - time[0])
+        if point_density < low_density_threshold:
+            recovery_intervals = [[start - 0.1, end + 0.1] for start, end in recovery_intervals]
+            drop_intervals = [[start - 0.1, end + 0.1] for start, end in drop_intervals]
+
+    return recovery_intervals, drop_intervals
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["Время (часы)", "Давление (атм)"]
+
+
+class WellSeries:
+    """
+    Компактный ряд скважины: непрерывные массивы времени (часы) и давления (атм).
+
+    Используется вместо DataFrame внутри алгоритмов; DataFrame создается только на
+    границах ввода-вывода (from_frame/to_frame). dtype=np.float32 вдвое уменьшает
+    память; точность времени при этом около 1e-7 от его значения (≈ 4 с на 10 000 часов),
+    поэтому интервалы, длительность которых почти совпадает с порогом, могут приниматься
+    иначе, чем в float64.
+    Массивы не копируются, если уже имеют нужный тип и расположены непрерывно
+    (например, отображенные в память колонки из ingest).
+    """
+
+    __slots__ = ("time", "pressure")
+
+    def __init__(self, time, pressure, dtype=np.float64):
+        self.time = np.ascontiguousarray(time, dtype=dtype)
+        self.pressure = np.ascontiguousarray(pressure, dtype=dtype)
+        if self.time.ndim != 1 or self.time.shape != self.pressure.shape:
+            raise ValueError("Время и давление должны быть одномерными массивами одинаковой длины")
+
+    @classmethod
+    def from_frame(cls, frame, dtype=np.float64):
+        """
+        Создает ряд из DataFrame; колонки времени и давления берутся по позиции.
+        """
+        return cls(frame.iloc[:, 0].to_numpy(), frame.iloc[:, 1].to_numpy(), dtype)
+
+    def to_frame(self):
+        """
+        DataFrame с колонками COLUMNS поверх тех же массивов (без копирования).
+        """
+        return pd.DataFrame({COLUMNS[0]: self.time, COLUMNS[1]: self.pressure}, copy=False)
+
+    def astype(self, dtype):
+        return WellSeries(self.time, self.pressure, dtype)
+
+    @property
+    def dtype(self):
+        return self.time.dtype
+
+    @property
+    def nbytes(self):
+        return self.time.nbytes + self.pressure.nbytes
+
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, column):
+        # Совместимость с кодом, обращающимся к колонкам DataFrame по имени
+        if column == COLUMNS[0]:
+            return self.time
+        if column == COLUMNS[1]:
+            return self.pressure
+        raise KeyError(column)
+
+    def __repr__(self):
+        return f"WellSeries(n={len(self)}, dtype={self.dtype})"
+
+
+def as_series(data, dtype=None):
+    """
+    Приводит DataFrame или WellSeries к WellSeries (при необходимости — к типу dtype).
+    """
+    if isinstance(data, WellSeries):
+        return data if dtype is None or data.dtype == dtype else data.astype(dtype)
+    return WellSeries.from_frame(data, dtype or np.float64)
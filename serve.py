@@ -0,0 +1,104 @@
+"""
+Запуск веб-приложения в рабочем режиме (app.py запускает отладочный сервер Flask).
+
+Используется gunicorn с предварительной загрузкой: главный процесс один раз импортирует
+приложение с numpy, pandas, scipy и matplotlib и прогревает его обнаружением интервалов
+и построением графика на WARMUP_FILE, после чего порождает рабочие процессы через fork.
+Рабочие процессы, в том числе перезапущенные после сбоя, получают готовое состояние
+и не тратят время на импорт; каждый обслуживает запросы в нескольких потоках.
+
+Состояние и результаты задач (JOB_STATE_DIR), пакеты (BATCH_STATE_DIR) и ряды для
+/api/series (SERIES_DIR) хранятся на диске, поэтому страницы /jobs и /batches работают
+при любом числе процессов (--workers): запрос может попасть не в тот процесс, который
+поставил задачу. Кэш результатов и ограничение очереди у каждого процесса свои.
+Процессы анализа порождаются через forkserver, а не fork многопоточного рабочего процесса.
+
+    python serve.py --bind 0.0.0.0:5000 --threads 8
+
+Если gunicorn недоступен (например, в Windows), приложение после прогрева запускается
+на многопоточном сервере werkzeug без отладчика и перезагрузки.
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import time
+import metrics
+from config import SERVE_BIND, SERVE_WORKERS, SERVE_THREADS, SERVE_TIMEOUT, WARMUP_FILE
+
+logger = logging.getLogger("serve")
+
+
+def warm_up(path=WARMUP_FILE):
+    """
+    Анализирует файл path в текущем процессе: загружает лениво импортируемые модули
+    (scipy.signal, matplotlib), кэш коэффициентов фильтра и бинарный кэш файла.
+    Очередь задач и пул потоков построения не используются: их процессы и потоки
+    не наследуются при fork. Замеры прогрева не попадают в /metrics.
+    """
+    from app import load_data
+    from render import plot_intervals
+    from search import detect_patterns
+
+    if not os.path.exists(path):
+        logger.warning("Файл для прогрева %s не найден, прогрев пропущен", path)
+        return
+    started = time.perf_counter()
+    with metrics.capture():
+        data = load_data(path)
+        recovery_intervals, drop_intervals, derivative = detect_patterns(data)
+        plot_intervals(data, recovery_intervals, drop_intervals, derivative)
+    logger.info("Прогрев на %s: %.2f с", path, time.perf_counter() - started)
+
+
+def load_app(warmup_file=WARMUP_FILE):
+    from app import app
+    if warmup_file:
+        warm_up(warmup_file)
+    return app
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", [args.bind])
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("threads", args.threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("timeout", args.timeout)
+            self.cfg.set("preload_app", True)
+
+        def load(self):
+            return load_app(args.warmup_file)
+
+    Server().run()
+
+
+def run_werkzeug(args):
+    from werkzeug.serving import run_simple
+
+    host, _, port = args.bind.rpartition(":")
+    run_simple(host or "0.0.0.0", int(port), load_app(args.warmup_file), threaded=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Запуск веб-приложения в рабочем режиме")
+    parser.add_argument("--bind", default=SERVE_BIND, help="адрес в виде хост:порт")
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--threads", type=int, default=SERVE_THREADS)
+    parser.add_argument("--timeout", type=int, default=SERVE_TIMEOUT)
+    parser.add_argument("--warmup-file", default=WARMUP_FILE, help="пустая строка отключает прогрев")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    if importlib.util.find_spec("gunicorn") is None:
+        logger.warning("gunicorn не установлен, используется сервер werkzeug в одном процессе")
+        run_werkzeug(args)
+    else:
+        run_gunicorn(args)
+
+
+if __name__ == "__main__":
+    main()
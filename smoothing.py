@@ -0,0 +1,130 @@
+"""
+Алгоритмы сглаживания ряда давления и вычисления производной.
+
+Каждый алгоритм принимает одномерный массив или двумерный массив из нескольких
+скважин одинаковой длины (по строкам) и вычисляет производную по последней оси.
+Производная берется на точку (delta=1) или по времени, если передан массив time
+(общий для всех строк). Алгоритмы выбираются по имени из BACKENDS:
+
+- "savgol_gradient" — фильтр Савицкого–Голея, затем np.gradient (исходный алгоритм);
+- "savgol" — производная Савицкого–Голея (deriv=1) за один проход;
+- "ewma" — экспоненциальное скользящее среднее (O(n), с запаздыванием), затем np.gradient;
+- "median" — скользящая медиана (устойчива к выбросам), затем np.gradient.
+
+Коэффициенты фильтра Савицкого–Голея, включая краевые, вычисляются один раз для
+каждого набора (окно, порядок, производная, dtype) и кэшируются. scipy.signal
+импортируется при первом вычислении (его загрузка заметно замедляет импорт модуля).
+"""
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from scipy.ndimage import convolve1d
+
+
+@lru_cache(maxsize=64)
+def savgol_kernels(window_size, polyorder, deriv=0, dtype="float64"):
+    """
+    Коэффициенты фильтра Савицкого–Голея: ядро свертки для внутренних точек и матрица
+    для окна window_size точек у края (аналог mode="interp": полином по первым и последним
+    window_size точкам). Массивы доступны только для чтения.
+    """
+    from scipy.signal import savgol_coeffs, savgol_filter
+    kernel = savgol_coeffs(window_size, polyorder, deriv=deriv).astype(dtype)
+    edges = savgol_filter(np.eye(window_size), window_size, polyorder, deriv=deriv, axis=0).astype(dtype)
+    kernel.setflags(write=False)
+    edges.setflags(write=False)
+    return kernel, edges
+
+
+def savgol(values, window_size, polyorder, deriv=0):
+    """
+    Фильтр Савицкого–Голея (mode="interp") по последней оси на кэшированных коэффициентах.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[-1]
+    if n < window_size:
+        from scipy.signal import savgol_filter
+        return savgol_filter(values, window_size, polyorder, deriv=deriv, axis=-1)
+    kernel, edges = savgol_kernels(window_size, polyorder, deriv, values.dtype.str)
+    result = convolve1d(values, kernel, axis=-1, mode="constant")
+    half = window_size // 2
+    if half:
+        result[..., :half] = values[..., :window_size] @ edges[:half].T
+        result[..., n - half:] = values[..., n - window_size:] @ edges[window_size - half:].T
+    return result
+
+
+def gradient(values, time=None):
+    """
+    Производная по последней оси: на точку или по времени time.
+    """
+    if time is None:
+        return np.gradient(values, axis=-1)
+    return np.gradient(values, time, axis=-1)
+
+
+def per_time(derivative, time=None):
+    """
+    Производная по индексу (savgol с deriv=1), пересчитанная на единицу времени.
+    """
+    if time is not None:
+        # Производная по индексу делится на шаг времени в каждой точке (неравномерная сетка)
+        derivative /= np.gradient(time)
+    return derivative
+
+
+def savgol_index_derivative(values, window_size, polyorder):
+    return savgol(values, window_size, polyorder, deriv=1)
+
+
+def ewma(values, window_size, polyorder=None):
+    from scipy.signal import lfilter
+    values = np.asarray(values, dtype=np.float64)
+    alpha = 2.0 / (window_size + 1)
+    initial = (1 - alpha) * values[..., :1]  # начинаем с первого значения, а не с нуля
+    smoothed, _ = lfilter([alpha], [1, alpha - 1], values, axis=-1, zi=initial)
+    return smoothed
+
+
+def rolling_median(values, window_size, polyorder=None):
+    values = np.asarray(values, dtype=np.float64)
+    frame = pd.DataFrame(np.atleast_2d(values).T)
+    smoothed = frame.rolling(window_size, center=True, min_periods=1).median().to_numpy().T
+    return smoothed.reshape(values.shape)
+
+
+# имя -> (сглаживание, производная результата сглаживания)
+BACKENDS = {
+    "savgol_gradient": (savgol, gradient),
+    "savgol": (savgol_index_derivative, per_time),
+    "ewma": (ewma, gradient),
+    "median": (rolling_median, gradient),
+}
+
+
+def _backend(backend):
+    try:
+        return BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Неизвестный алгоритм сглаживания: {backend}") from None
+
+
+def smooth(values, window_size, polyorder, backend="savgol_gradient"):
+    """
+    Первый шаг алгоритма backend: сглаженный ряд (для "savgol" — сразу производная на точку).
+    """
+    return _backend(backend)[0](values, window_size, polyorder)
+
+
+def differentiate(smoothed, time=None, backend="savgol_gradient"):
+    """
+    Второй шаг алгоритма backend: производная результата smooth() на точку или по времени.
+    """
+    return _backend(backend)[1](smoothed, time)
+
+
+def derivative(values, window_size, polyorder, time=None, backend="savgol_gradient"):
+    """
+    Производная сглаженного ряда (или строк двумерного массива) алгоритмом backend.
+    """
+    return differentiate(smooth(values, window_size, polyorder, backend), time, backend)
@@ -0,0 +1,228 @@
+"""
+Локальное хранилище результатов обнаружения (SQLite).
+
+Каждый запуск пакетной обработки (export.py) записывается как отдельный прогон:
+по скважине хранятся оценки F1, а интервалы КВД/КПД — отдельными строками с числовыми
+началом и концом, без строкового представления списков. Индексы по типу интервала
+и началу, по скважине и по длительности позволяют отвечать на вопросы вида
+"все КВД, пересекающие часы X–Y" и "скважины, у которых упал F1", не перечитывая
+выгрузки целиком. Запросы по интервалам используют последний прогон каждой скважины.
+
+    python store.py import submission.csv
+    python store.py overlap 10 20 --kind КВД
+    python store.py f1-drops --min-drop 0.05
+"""
+import argparse
+import sqlite3
+import time
+import pandas as pd
+from config import RESULTS_DB
+from utils import safe_parse_intervals
+
+RECOVERY = "КВД"
+DROP = "КПД"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    params TEXT NOT NULL DEFAULT '',
+    label TEXT
+);
+CREATE TABLE IF NOT EXISTS wells (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    well TEXT NOT NULL,
+    digest TEXT,
+    f1_recovery REAL,
+    f1_drop REAL,
+    PRIMARY KEY (well, run_id)
+);
+-- последний прогон каждой скважины
+CREATE TABLE IF NOT EXISTS latest (
+    well TEXT PRIMARY KEY,
+    run_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS intervals (
+    run_id INTEGER NOT NULL,
+    well TEXT NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('КВД', 'КПД')),
+    start REAL NOT NULL,
+    "end" REAL NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS intervals_range ON intervals (kind, start, "end", well, run_id);
+CREATE INDEX IF NOT EXISTS intervals_well ON intervals (well, run_id, kind, start);
+CREATE INDEX IF NOT EXISTS intervals_duration ON intervals (kind, duration);
+"""
+
+
+class ResultStore:
+    """
+    Хранилище результатов в файле SQLite path. Экземпляр используется в одном потоке.
+    """
+
+    def __init__(self, path=RESULTS_DB):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start_run(self, params="", label=None):
+        """
+        Создает прогон и возвращает его идентификатор.
+        """
+        with self.connection:
+            cursor = self.connection.execute("INSERT INTO runs (created, params, label) VALUES (?, ?, ?)",
+                                             (time.time(), params, label))
+        return cursor.lastrowid
+
+    def add_wells(self, run_id, results):
+        """
+        Записывает результаты скважин прогона одной транзакцией. results — словари
+        в формате DataProcessor.process_file ("file", "recovery_intervals", "drop_intervals",
+        необязательные "f1_recovery", "f1_drop", "digest"); записи с "error" пропускаются.
+        Повторная запись скважины в том же прогоне заменяет предыдущую.
+        """
+        wells = []
+        intervals = []
+        for result in results:
+            if "error" in result:
+                continue
+            well = result["file"]
+            wells.append((run_id, well, result.get("digest"), result.get("f1_recovery"), result.get("f1_drop")))
+            for kind, key in ((RECOVERY, "recovery_intervals"), (DROP, "drop_intervals")):
+                intervals.extend((run_id, well, kind, float(start), float(end), float(end) - float(start))
+                                 for start, end in result.get(key, ()))
+        with self.connection:
+            self.connection.executemany("DELETE FROM intervals WHERE well = ? AND run_id = ?",
+                                        [(well[1], run_id) for well in wells])
+            self.connection.executemany("INSERT OR REPLACE INTO wells VALUES (?, ?, ?, ?, ?)", wells)
+            self.connection.executemany("INSERT INTO intervals VALUES (?, ?, ?, ?, ?, ?)", intervals)
+            self.connection.executemany(
+                "INSERT INTO latest VALUES (?, ?) ON CONFLICT (well) DO UPDATE SET run_id = MAX(run_id, excluded.run_id)",
+                [(well[1], run_id) for well in wells])
+        return len(wells)
+
+    def add_run(self, results, params="", label=None):
+        """
+        Записывает результаты пакетной обработки как новый прогон и возвращает его идентификатор.
+        """
+        run_id = self.start_run(params, label)
+        self.add_wells(run_id, results)
+        return run_id
+
+    def import_csv(self, path, label=None):
+        """
+        Переносит выгрузку (submission.csv) в хранилище как новый прогон.
+        """
+        table = pd.read_csv(path, dtype={"file": str})
+        results = []
+        for row in table.to_dict("records"):
+            result = {"file": row["file"],
+                      "recovery_intervals": safe_parse_intervals(row["recovery"]),
+                      "drop_intervals": safe_parse_intervals(row["drop"])}
+            for key in ("f1_recovery", "f1_drop"):
+                if key in row and not pd.isna(row[key]):
+                    result[key] = float(row[key])
+            results.append(result)
+        return self.add_run(results, label=label or path)
+
+    def overlapping(self, start, end, kind=RECOVERY, wells=None):
+        """
+        Интервалы типа kind из последнего прогона каждой скважины, пересекающие [start, end]
+        (по всем скважинам или по списку wells). Возвращает список словарей well, kind, start, end.
+        """
+        # Начало пересекающего интервала не раньше start - (наибольшая длительность):
+        # так запрос ограничивается диапазоном индекса с обеих сторон
+        longest = self.connection.execute("SELECT MAX(duration) FROM intervals WHERE kind = ?", (kind,)).fetchone()[0]
+        if longest is None:
+            return []
+        query = """
+            SELECT i.well, i.kind, i.start, i."end" FROM intervals i
+            JOIN latest l ON l.well = i.well AND l.run_id = i.run_id
+            WHERE i.kind = ? AND i.start BETWEEN ? AND ? AND i."end" >= ?
+        """
+        args = [kind, start - longest, end, start]
+        if wells is not None:
+            wells = list(wells)
+            query += f" AND i.well IN ({', '.join('?' * len(wells))})"
+            args += wells
+        rows = self.connection.execute(query + " ORDER BY i.well, i.start", args)
+        return [dict(row) for row in rows]
+
+    def well_intervals(self, well, kind=None):
+        """
+        Интервалы скважины из ее последнего прогона (всех типов или типа kind).
+        """
+        query = """
+            SELECT i.kind, i.start, i."end" FROM intervals i
+            JOIN latest l ON l.well = i.well AND l.run_id = i.run_id
+            WHERE i.well = ?
+        """
+        args = [well]
+        if kind is not None:
+            query += " AND i.kind = ?"
+            args.append(kind)
+        return [dict(row) for row in self.connection.execute(query + " ORDER BY i.kind, i.start", args)]
+
+    def f1_drops(self, min_drop=0.0):
+        """
+        Скважины, у которых в последнем прогоне F1 для КВД или КПД меньше, чем в предыдущем,
+        больше чем на min_drop. Возвращает список словарей с обеими оценками и прогонами.
+        """
+        rows = self.connection.execute("""
+            SELECT well, run_id, previous_run_id, f1_recovery, previous_recovery, f1_drop, previous_drop
+            FROM (
+                SELECT well, run_id, f1_recovery, f1_drop,
+                       LAG(run_id) OVER history AS previous_run_id,
+                       LAG(f1_recovery) OVER history AS previous_recovery,
+                       LAG(f1_drop) OVER history AS previous_drop,
+                       ROW_NUMBER() OVER (PARTITION BY well ORDER BY run_id DESC) AS position
+                FROM wells
+                WINDOW history AS (PARTITION BY well ORDER BY run_id)
+            )
+            WHERE position = 1 AND (f1_recovery < previous_recovery - ? OR f1_drop < previous_drop - ?)
+            ORDER BY well
+        """, (min_drop, min_drop))
+        return [dict(row) for row in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Запросы к хранилищу результатов")
+    parser.add_argument("--db", default=RESULTS_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+    imported = commands.add_parser("import", help="перенести выгрузку CSV в хранилище")
+    imported.add_argument("csv")
+    overlap = commands.add_parser("overlap", help="интервалы, пересекающие диапазон часов")
+    overlap.add_argument("start", type=float)
+    overlap.add_argument("end", type=float)
+    overlap.add_argument("--kind", choices=[RECOVERY, DROP], default=RECOVERY)
+    drops = commands.add_parser("f1-drops", help="скважины, у которых упал F1")
+    drops.add_argument("--min-drop", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    with ResultStore(args.db) as store:
+        if args.command == "import":
+            print(f"Прогон {store.import_csv(args.csv)}: {args.csv} сохранен в {args.db}")
+        elif args.command == "overlap":
+            for row in store.overlapping(args.start, args.end, args.kind):
+                print(f"{row['well']}\t{row['kind']}\t{row['start']:.4f}\t{row['end']:.4f}")
+        else:
+            for row in store.f1_drops(args.min_drop):
+                print(f"{row['well']}\tКВД {row['previous_recovery']} -> {row['f1_recovery']}"
+                      f"\tКПД {row['previous_drop']} -> {row['f1_drop']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+import io
+import numpy as np
+import pandas as pd
+from config import PEAK_OFFSET, RECOVERY_DURATION_POINTS, CHUNK_SIZE
+from search import smooth_derivative, _noise_prefix, _scan_candidates, _merge_spans
+
+RECOVERY = "КВД"
+DROP = "КПД"
+
+
+class StreamingDetector:
+    """
+    Инкрементальный детектор КВД/КПД для потоковых данных манометра.
+
+    Принимает данные порциями (время, давление) и хранит только хвост ряда,
+    необходимый для сглаживания и ещё не проверенных кандидатов, а также
+    состояние открытых интервалов. Интервал возвращается сразу после того,
+    как никакой будущий кандидат уже не может его продлить.
+
+    Сглаживание, производная и проверки кандидатов совпадают с detect_patterns,
+    поэтому объединение всех возвращённых интервалов равно результату пакетной
+    обработки того же ряда. Единственное отличие: решение о расширении интервалов
+    при низкой плотности данных принимается по уже полученным точкам
+    (expand_low_density=False отключает расширение, чтобы применить его позже).
+    """
+
+    def __init__(self, window_size=10, threshold=5.0, min_points=20, noise_threshold=10.0,
+                 min_recovery_duration=4, min_drop_duration=6, low_density_threshold=10, merge=True,
+                 expand_low_density=True):
+        self.window_size = window_size
+        self.threshold = threshold
+        self.min_points = min_points
+        self.noise_threshold = noise_threshold
+        self.min_duration = {RECOVERY: min_recovery_duration, DROP: min_drop_duration}
+        self.low_density_threshold = low_density_threshold
+        self.merge = merge
+        self.expand_low_density = expand_low_density
+
+        self._time = np.empty(0)
+        self._pressure = np.empty(0)
+        self._offset = 0  # глобальный индекс первой точки буфера
+        self._next_scan = 0  # первый индекс, производная в котором ещё не проверена
+        self._first_time = None
+        self._pending = {kind: (np.empty(0, dtype=int), np.empty(0, dtype=int)) for kind in (RECOVERY, DROP)}
+        self._open = {RECOVERY: None, DROP: None}  # [start_idx, end_idx, start_time, end_time]
+        self._finished = False
+
+    @property
+    def samples_seen(self):
+        """
+        Общее количество полученных точек.
+        """
+        return self._offset + len(self._time)
+
+    @property
+    def time_span(self):
+        """
+        Длительность полученной части ряда (в часах).
+        """
+        if self._first_time is None:
+            return 0.0
+        return self._time[-1] - self._first_time
+
+    @property
+    def buffered(self):
+        """
+        Количество точек, хранящихся в буфере.
+        """
+        return len(self._time)
+
+    def update(self, time, pressure):
+        """
+        Добавляет порцию данных и возвращает закрывшиеся интервалы КВД и КПД.
+        """
+        if self._finished:
+            raise RuntimeError("Детектор уже завершён, новые данные не принимаются")
+        time = np.asarray(time, dtype=float)
+        pressure = np.asarray(pressure, dtype=float)
+        if len(time) != len(pressure):
+            raise ValueError("Длины массивов времени и давления не совпадают")
+        if len(time) == 0:
+            return [], []
+        if self._first_time is None:
+            self._first_time = time[0]
+        self._time = np.concatenate((self._time, time))
+        self._pressure = np.concatenate((self._pressure, pressure))
+        return self._advance(final=False)
+
+    def finish(self):
+        """
+        Сообщает об окончании потока и возвращает все оставшиеся интервалы.
+        """
+        if self._finished:
+            return [], []
+        self._finished = True
+        if self.samples_seen == 0:
+            return [], []
+        return self._advance(final=True)
+
+    def _advance(self, final):
+        closed = {RECOVERY: [], DROP: []}
+        self._scan_derivative(final)
+
+        prefix = None
+        for kind in (RECOVERY, DROP):
+            starts, ends = self._pending[kind]
+            # Кандидат можно проверить, когда получена точка его конца
+            ready = len(starts) if final else np.searchsorted(ends, self.samples_seen)
+            if ready:
+                if prefix is None:
+                    prefix = _noise_prefix(self._pressure, self.noise_threshold)
+                accepted = _scan_candidates(starts[:ready] - self._offset, ends[:ready] - self._offset,
+                                            self._time, prefix, self.min_points, self.min_duration[kind])
+                self._accept(kind, starts[:ready][accepted], ends[:ready][accepted], closed[kind])
+                self._pending[kind] = starts[ready:], ends[ready:]
+
+            # Открытый интервал закрывается, когда ни один будущий кандидат не начнётся внутри него
+            group = self._open[kind]
+            if group is not None and (final or group[1] < self._frontier(kind)):
+                closed[kind].append([group[2], group[3]])
+                self._open[kind] = None
+
+        self._trim()
+        return self._expand(closed[RECOVERY]), self._expand(closed[DROP])
+
+    def _scan_derivative(self, final):
+        """
+        Сглаживает буфер и ищет кандидатов в точках, где производная уже не изменится
+        с приходом новых данных.
+        """
+        n = self.samples_seen
+        hi = n if final else n - self.window_size - 1
+        lo = self._next_scan
+        if hi <= lo:
+            return
+
+        derivative = smooth_derivative(self._pressure, self.window_size)[lo - self._offset:hi - self._offset]
+        indices = np.arange(lo, hi)
+
+        peaks = indices[derivative > self.threshold]
+        starts = np.maximum(0, peaks - PEAK_OFFSET)
+        self._push(RECOVERY, starts, starts + RECOVERY_DURATION_POINTS)
+
+        valleys = indices[derivative < -self.threshold]
+        starts = np.maximum(0, valleys - PEAK_OFFSET)
+        self._push(DROP, starts, starts + (1.1 * (valleys - starts)).astype(int))
+
+        self._next_scan = hi
+
+    def _push(self, kind, starts, ends):
+        pending_starts, pending_ends = self._pending[kind]
+        self._pending[kind] = np.concatenate((pending_starts, starts)), np.concatenate((pending_ends, ends))
+
+    def _accept(self, kind, starts, ends, closed):
+        if len(starts) == 0:
+            return
+        if not self.merge:
+            closed.extend(self._interval(start, end) for start, end in zip(starts, ends))
+            return
+        starts, ends = _merge_spans(starts, ends)
+        group = self._open[kind]
+        for start, end in zip(starts, ends):
+            if group is not None and start <= group[1]:
+                if end > group[1]:
+                    group[1], group[3] = end, self._time[end - self._offset]
+                continue
+            if group is not None:
+                closed.append([group[2], group[3]])
+            group = [start, end] + self._interval(start, end)
+        self._open[kind] = group
+
+    def _interval(self, start, end):
+        return [self._time[start - self._offset], self._time[end - self._offset]]
+
+    def _frontier(self, kind):
+        """
+        Наименьшее начало, с которого может стартовать ещё не принятый кандидат.
+        """
+        frontier = max(0, self._next_scan - PEAK_OFFSET)
+        pending_starts = self._pending[kind][0]
+        if len(pending_starts):
+            frontier = min(frontier, pending_starts[0])
+        return frontier
+
+    def _trim(self):
+        """
+        Отбрасывает точки буфера, которые больше не нужны ни сглаживанию, ни кандидатам.
+        """
+        keep = self._next_scan - max(self.window_size + 1, PEAK_OFFSET)
+        for starts, _ in self._pending.values():
+            if len(starts):
+                keep = min(keep, starts[0])
+        drop = keep - self._offset
+        if drop > 0:
+            self._time = self._time[drop:]
+            self._pressure = self._pressure[drop:]
+            self._offset += drop
+
+    def _expand(self, intervals):
+        """
+        Расширяет интервалы при низкой дискретизации данных, как detect_patterns.
+        """
+        if not self.expand_low_density or not intervals:
+            return intervals
+        return expand_low_density(intervals, self.samples_seen, self.time_span, self.low_density_threshold)
+
+
+def expand_low_density(intervals, n_points, total_duration, low_density_threshold=10):
+    """
+    Немного расширяет интервалы, если дискретизация данных низкая.
+    """
+    if total_duration > 0 and n_points / total_duration < low_density_threshold:
+        return [[start - 0.1, end + 0.1] for start, end in intervals]
+    return intervals
+
+
+def detect_stream(chunks, **params):
+    """
+    Прогоняет последовательность порций (время, давление) через StreamingDetector
+    и возвращает все найденные интервалы КВД и КПД.
+
+    Расширение интервалов при низкой дискретизации применяется после получения
+    всех порций, так что результат совпадает с detect_patterns для того же ряда.
+    """
+    low_density_threshold = params.pop("low_density_threshold", 10)
+    detector = StreamingDetector(low_density_threshold=low_density_threshold, expand_low_density=False, **params)
+    recovery_intervals, drop_intervals = [], []
+    for time, pressure in chunks:
+        recovery, drop = detector.update(time, pressure)
+        recovery_intervals.extend(recovery)
+        drop_intervals.extend(drop)
+    recovery, drop = detector.finish()
+    recovery_intervals.extend(recovery)
+    drop_intervals.extend(drop)
+
+    n_points, total_duration = detector.samples_seen, detector.time_span
+    recovery_intervals = expand_low_density(recovery_intervals, n_points, total_duration, low_density_threshold)
+    drop_intervals = expand_low_density(drop_intervals, n_points, total_duration, low_density_threshold)
+    return recovery_intervals, drop_intervals
+
+
+class SeriesSummary:
+    """
+    Сводная статистика ряда, накапливаемая по порциям (время, давление).
+    """
+
+    def __init__(self):
+        self.samples = 0
+        self.time_start = None
+        self.time_end = None
+        self.pressure_min = np.inf
+        self.pressure_max = -np.inf
+        self._pressure_sum = 0.0
+
+    def update(self, time, pressure):
+        if len(time) == 0:
+            return
+        if self.time_start is None:
+            self.time_start = float(time[0])
+        self.time_end = float(time[-1])
+        self.samples += len(pressure)
+        self.pressure_min = min(self.pressure_min, float(np.min(pressure)))
+        self.pressure_max = max(self.pressure_max, float(np.max(pressure)))
+        self._pressure_sum += float(np.sum(pressure))
+
+    def track(self, chunks):
+        """
+        Пропускает порции дальше, попутно накапливая статистику.
+        """
+        for time, pressure in chunks:
+            self.update(time, pressure)
+            yield time, pressure
+
+    def as_dict(self):
+        if self.samples == 0:
+            return {"samples": 0}
+        return {
+            "samples": self.samples,
+            "time_start": self.time_start,
+            "time_end": self.time_end,
+            "duration": self.time_end - self.time_start,
+            "pressure_min": self.pressure_min,
+            "pressure_max": self.pressure_max,
+            "pressure_mean": self._pressure_sum / self.samples,
+        }
+
+
+def iter_csv_chunks(file_path, chunksize=CHUNK_SIZE):
+    """
+    Читает CSV-файл скважины блоками и возвращает порции (время, давление).
+    Колонки берутся по позиции, как и при обычной загрузке.
+    """
+    with pd.read_csv(file_path, usecols=[0, 1], chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk.iloc[:, 0].to_numpy(dtype=float), chunk.iloc[:, 1].to_numpy(dtype=float)
+
+
+def iter_csv_stream(stream, block_size=1 << 20):
+    """
+    Разбирает CSV из бинарного потока (например, тела HTTP-запроса) по мере чтения
+    и возвращает порции (время, давление). Строка заголовка, если она есть, пропускается.
+    """
+    tail = b""
+    header_checked = False
+    eof = False
+    while not eof:
+        block = stream.read(block_size)
+        eof = not block
+        block = tail + block
+        if eof:
+            tail = b""
+        else:
+            # Неполная последняя строка дочитывается со следующим блоком
+            cut = block.rfind(b"\n") + 1
+            block, tail = block[:cut], block[cut:]
+        if block and not header_checked:
+            first_line, _, rest = block.partition(b"\n")
+            if not _is_numeric_row(first_line):
+                block = rest
+            header_checked = True
+        if block.strip():
+            chunk = pd.read_csv(io.BytesIO(block), header=None, usecols=[0, 1])
+            yield chunk.iloc[:, 0].to_numpy(dtype=float), chunk.iloc[:, 1].to_numpy(dtype=float)
+
+
+def _is_numeric_row(line):
+    try:
+        [float(value) for value in line.split(b",")[:2]]
+    except ValueError:
+        return False
+    return True
+
+
+def detect_file_chunked(file_path, chunksize=CHUNK_SIZE, **params):
+    """
+    Обнаруживает интервалы КВД и КПД в CSV-файле произвольного размера.
+
+    Файл читается блоками по chunksize строк. Между блоками StreamingDetector
+    сохраняет перекрытие, равное окну сглаживания плюс максимальной длине
+    интервала (PEAK_OFFSET + RECOVERY_DURATION_POINTS точек), поэтому интервалы,
+    пересекающие границу блоков, склеиваются, а пиковое потребление памяти не зависит
+    от длины файла. Расширение интервалов при низкой дискретизации применяется после
+    чтения всего файла, так что результат совпадает с detect_patterns.
+    """
+    return detect_stream(iter_csv_chunks(file_path, chunksize), **params)
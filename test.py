@@ -1,3 +1,4 @@
+import matplotlib.pyplot as plt
 import pandas as pd
 from search import detect_patterns
 from visual import plot_intervals
@@ -31,7 +32,8 @@ print("КВД интервалы:", recovery_intervals)
 print("КПД интервалы:", drop_intervals)
 
 # Визуализация результатов
-plot_intervals(real_data, recovery_intervals, drop_intervals)
+plot_intervals(real_data, recovery_intervals, drop_intervals, plt.figure(figsize=(12, 6)))
+plt.show()
 
 # Оценка качества на реальных данных
 f1_recovery = calculate_f1_score(true_recovery, recovery_intervals, real_data)
@@ -0,0 +1,20 @@
+import pytest
+from data import SeriesSpec
+
+# Параметры, при которых на синтетических рядах находятся и КВД, и КПД
+DETECT_PARAMS = {"threshold": 0.5, "min_recovery_duration": 1.0, "min_drop_duration": 0.5}
+
+CASES = [
+    {"noise": 0.1, "shape": "exponential", "n_events": 6},
+    {"noise": 0.1, "shape": "step", "n_events": 8},
+    {"noise": 0.2, "shape": "log", "n_events": 10},
+    {"noise": 0.3, "shape": "step", "n_events": 12},
+]
+
+
+@pytest.fixture(params=CASES, ids=lambda case: f"{case['shape']}-{case['n_events']}")
+def spec(request):
+    """
+    Синтетический ряд на минутной сетке (20 000 точек) с несколькими событиями КВД/КПД.
+    """
+    return SeriesSpec(n_points=20_000, seed=3, **request.param)
@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+import ingest
+from conftest import DETECT_PARAMS
+from data_processor import DataProcessor
+from search import detect_patterns
+
+
+@pytest.fixture
+def processor_dirs(spec, tmp_path, monkeypatch):
+    """
+    Директории данных и разметки с одной скважиной; бинарный кэш — во временной директории.
+    Разметка — найденные интервалы, сдвинутые на 3 минуты (в пределах порога MAE),
+    поэтому оценки F1 положительны, но меньше 1.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ingest, "_default_cache", None)
+    data_dir, intervals_dir = tmp_path / "data", tmp_path / "intervals"
+    data_dir.mkdir()
+    intervals_dir.mkdir()
+    spec.to_csv(data_dir / "well.csv")
+    recovery, drop, _ = detect_patterns(pd.read_csv(data_dir / "well.csv"), **DETECT_PARAMS)
+    markup = {kind: [[float(start) + 0.05, float(end) + 0.05] for start, end in intervals]
+              for kind, intervals in (("recovery", recovery), ("drop", drop))}
+    pd.DataFrame({"recovery": [str(markup["recovery"])], "drop": [str(markup["drop"])]}).to_csv(
+        intervals_dir / "well.csv", index=False)
+    return str(data_dir), str(intervals_dir)
+
+
+def test_chunked_matches_whole_file(processor_dirs):
+    whole = DataProcessor(*processor_dirs).process_file("well.csv", DETECT_PARAMS)
+    chunked = DataProcessor(*processor_dirs, chunksize=3000).process_file("well.csv", DETECT_PARAMS)
+    assert whole["recovery_intervals"] and whole["drop_intervals"]
+    assert 0 < whole["f1_recovery"] < 1 and 0 < whole["f1_drop"] < 1
+    for key in ("recovery_intervals", "drop_intervals", "f1_recovery", "f1_drop"):
+        assert chunked[key] == whole[key]
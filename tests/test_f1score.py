@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from f1score import calculate_f1_score, calculate_mae
+from series import COLUMNS, WellSeries
+
+f1_score = pytest.importorskip("sklearn.metrics").f1_score
+
+
+def baseline_f1_score(true_intervals, pred_intervals, data, time_tolerance=0.08333, mae_threshold=0.15):
+    """
+    Исходная реализация: бинарные метки точек и sklearn.metrics.f1_score.
+    """
+    time = data[COLUMNS[0]]
+    true_labels = np.zeros(len(data))
+    pred_labels = np.zeros(len(data))
+    for true, pred in zip(true_intervals, pred_intervals):
+        if calculate_mae([true], [pred]) <= mae_threshold:
+            true_labels[np.searchsorted(time, true[0] - time_tolerance):np.searchsorted(time, true[1] + time_tolerance)] = 1
+            pred_labels[np.searchsorted(time, pred[0] - time_tolerance):np.searchsorted(time, pred[1] + time_tolerance)] = 1
+    return f1_score(true_labels, pred_labels, zero_division=0.0)
+
+
+def _random_intervals(rng, count, total):
+    starts = np.sort(rng.uniform(0, total - 5, count))
+    return np.column_stack((starts, starts + rng.uniform(0.5, 5, count))).tolist()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_sklearn_baseline(seed):
+    rng = np.random.default_rng(seed)
+    time = np.cumsum(rng.uniform(0.5, 1.5, 3000) / 60)
+    data = pd.DataFrame({COLUMNS[0]: time, COLUMNS[1]: np.zeros_like(time)})
+    true_intervals = _random_intervals(rng, rng.integers(1, 8), time[-1])
+    # Предсказания — сдвинутые истинные интервалы (часть проходит порог MAE), лишние или недостающие
+    pred_intervals = (np.asarray(true_intervals) + rng.normal(0, 0.1, (len(true_intervals), 2))).tolist()
+    pred_intervals = pred_intervals[:rng.integers(0, len(pred_intervals) + 1)]
+    pred_intervals += _random_intervals(rng, rng.integers(0, 3), time[-1])
+
+    expected = baseline_f1_score(true_intervals, pred_intervals, data)
+    assert calculate_f1_score(true_intervals, pred_intervals, data) == pytest.approx(expected)
+    series = WellSeries(time, np.zeros_like(time))
+    assert calculate_f1_score(true_intervals, pred_intervals, series) == pytest.approx(expected)
+
+
+def test_overlapping_predictions():
+    time = np.arange(0, 30, 1 / 60)
+    data = pd.DataFrame({COLUMNS[0]: time, COLUMNS[1]: np.zeros_like(time)})
+    true_intervals = [[5, 9], [8.9, 12]]
+    pred_intervals = [[5.05, 9.1], [8.95, 12.05]]
+    expected = baseline_f1_score(true_intervals, pred_intervals, data)
+    assert expected > 0
+    assert calculate_f1_score(true_intervals, pred_intervals, data) == pytest.approx(expected)
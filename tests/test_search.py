@@ -0,0 +1,35 @@
+import numpy as np
+from conftest import DETECT_PARAMS
+from data import SeriesSpec
+from search import detect_patterns
+
+
+def test_pyramid_matches_full_scan(spec):
+    series = spec.series()
+    recovery, drop, derivative = detect_patterns(series, **DETECT_PARAMS)
+    for pyramid in (True, "verify"):
+        pyramid_recovery, pyramid_drop, pyramid_derivative = detect_patterns(series, pyramid=pyramid, **DETECT_PARAMS)
+        assert (pyramid_recovery, pyramid_drop) == (recovery, drop)
+        # Вне участков, где возможно превышение порога, производная не считается
+        computed = pyramid_derivative != 0
+        np.testing.assert_allclose(pyramid_derivative[computed], derivative[computed])
+
+
+def test_pyramid_skips_quiet_series():
+    series = SeriesSpec(n_points=20_000, n_events=0).series()
+    recovery, drop, derivative = detect_patterns(series, pyramid="verify", **DETECT_PARAMS)
+    assert recovery == [] and drop == []
+    assert not derivative.any()
+
+
+def test_time_windows_match_index_mode_on_minute_grid(spec):
+    # На минутной сетке окна в часах совпадают с окнами в точках, а порог в атм/час
+    # соответствует порогу в атм на точку, умноженному на 60
+    series = spec.series()
+    recovery, drop, derivative = detect_patterns(series, **DETECT_PARAMS)
+    params = dict(DETECT_PARAMS, threshold=DETECT_PARAMS["threshold"] * 60)
+    time_recovery, time_drop, time_derivative = detect_patterns(series, time_windows=True, **params)
+    assert recovery and drop
+    np.testing.assert_allclose(time_recovery, recovery)
+    np.testing.assert_allclose(time_drop, drop)
+    np.testing.assert_allclose(time_derivative, derivative * 60, atol=1e-9)
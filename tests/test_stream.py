@@ -0,0 +1,31 @@
+import pandas as pd
+from conftest import DETECT_PARAMS
+from search import detect_patterns
+from stream import detect_stream, detect_file_chunked
+
+
+def _chunks(series, size):
+    for start in range(0, len(series), size):
+        yield series.time[start:start + size], series.pressure[start:start + size]
+
+
+def test_stream_matches_batch(spec):
+    series = spec.series()
+    recovery, drop, _ = detect_patterns(series, **DETECT_PARAMS)
+    assert recovery and drop
+    for size in (777, 4096, len(series)):
+        assert detect_stream(_chunks(series, size), **DETECT_PARAMS) == (recovery, drop)
+
+
+def test_stream_from_generator_blocks(spec):
+    recovery, drop, _ = detect_patterns(spec.series(), **DETECT_PARAMS)
+    assert detect_stream(spec.blocks(), **DETECT_PARAMS) == (recovery, drop)
+
+
+def test_chunked_file_matches_batch(spec, tmp_path):
+    path = tmp_path / "well.csv"
+    spec.to_csv(path)
+    # Сравнение с рядом, прочитанным из того же файла: запись в CSV округляет значения
+    recovery, drop, _ = detect_patterns(pd.read_csv(path), **DETECT_PARAMS)
+    assert recovery and drop
+    assert detect_file_chunked(path, chunksize=3000, **DETECT_PARAMS) == (recovery, drop)
@@ -0,0 +1,146 @@
+import logging
+import math
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from sklearn.model_selection import ParameterGrid
+from data_processor import DataProcessor
+from f1score import calculate_f1_score
+from quality import validate_series, point_density
+from search import smooth_derivative, detect_from_derivative
+from series import WellSeries
+
+logger = logging.getLogger("tuning")
+
+DEFAULT_WINDOW_SIZE = 10
+DEFAULT_SMOOTHING = "savgol_gradient"
+# Параметры, от которых зависит производная: по ним кэшируется сглаживание
+SMOOTHING_PARAMS = ("window_size", "smoothing", "time_windows")
+# Остальные параметры detect_patterns, которые можно перебирать
+DETECTION_PARAMS = ("threshold", "min_points", "noise_threshold", "min_recovery_duration", "min_drop_duration",
+                    "low_density_threshold", "merge")
+
+
+def _evaluate_well(processor, filename, configs):
+    """
+    Оценивает набор конфигураций на одной скважине.
+
+    configs — список пар (номер конфигурации, параметры). Ряд проверяется и делится
+    на участки (validate_series, по наибольшему окну сглаживания среди configs), и, как
+    в detect_segments, обнаружение выполняется на каждом участке отдельно. Сглаживание
+    и производная вычисляются один раз для каждого набора (window_size, smoothing,
+    time_windows) и переиспользуются для всех остальных параметров; при time_windows
+    производная считается по времени (атм/час), как в detect_patterns. Возвращает список пар
+    (номер конфигурации, F1-score).
+    """
+    window = max(params.get("window_size", DEFAULT_WINDOW_SIZE) for _, params in configs)
+    data, segments, _ = validate_series(processor.load_data(filename), window)
+    true_recovery, true_drop = processor.load_intervals(filename)
+    density = point_density(data)
+    parts = [WellSeries(data.time[start:end], data.pressure[start:end], data.dtype) for start, end in segments]
+
+    by_smoothing = defaultdict(list)
+    for index, params in configs:
+        key = (params.get("window_size", DEFAULT_WINDOW_SIZE), params.get("smoothing", DEFAULT_SMOOTHING),
+               bool(params.get("time_windows", False)))
+        by_smoothing[key].append((index, params))
+
+    scores = []
+    for (window_size, smoothing, time_windows), group in by_smoothing.items():
+        derivatives = [smooth_derivative(part.pressure, window_size, part.time if time_windows else None, smoothing)
+                       for part in parts]
+        for index, params in group:
+            detect_params = {k: v for k, v in params.items() if k in DETECTION_PARAMS}
+            recovery_intervals, drop_intervals = [], []
+            for part, derivative in zip(parts, derivatives):
+                recovery, drop = detect_from_derivative(part, derivative, time_windows=time_windows,
+                                                        point_density=density, **detect_params)
+                recovery_intervals.extend(recovery)
+                drop_intervals.extend(drop)
+            f1_recovery = calculate_f1_score(true_recovery, recovery_intervals, data)
+            f1_drop = calculate_f1_score(true_drop, drop_intervals, data)
+            scores.append((index, (f1_recovery + f1_drop) / 2))
+    return filename, scores
+
+
+def tune(data_dir, intervals_dir, param_grid, workers=None, halving=True, eta=2, min_wells=1):
+    """
+    Подбирает параметры detect_patterns по всем скважинам из data_dir.
+
+    Комбинации параметров оцениваются в пуле процессов (одна задача — одна скважина).
+    При halving=True используется последовательное деление пополам (successive halving):
+    сначала все конфигурации оцениваются на min_wells скважинах, затем лучшая доля 1/eta
+    переходит на следующий этап с числом скважин, увеличенным в eta раз, и так до
+    полного набора. Итоговые средние и поскважинные оценки считаются по всем скважинам.
+
+    В сетке допускаются только параметры из SMOOTHING_PARAMS и DETECTION_PARAMS;
+    остальные (например, pyramid, который влияет лишь на скорость) — ValueError.
+
+    Скважины без файла разметки в intervals_dir не участвуют в подборе. Скважина,
+    обработка которой завершилась ошибкой (например, нечитаемый файл), исключается
+    из подбора с записью в журнал, вместо нее на этапе берется следующая.
+
+    Возвращает словарь с ключами best_params, best_score, per_well (F1 лучшей
+    конфигурации по файлам), results (все конфигурации, дошедшие до последнего этапа)
+    и excluded (исключенные скважины и ошибки).
+    """
+    grids = param_grid if isinstance(param_grid, (list, tuple)) else [param_grid]
+    unsupported = sorted({key for grid in grids for key in grid} - set(SMOOTHING_PARAMS) - set(DETECTION_PARAMS))
+    if unsupported:
+        raise ValueError(f"Параметры не поддерживаются при подборе: {', '.join(unsupported)}")
+    processor = DataProcessor(data_dir, intervals_dir)
+    filenames = []
+    for filename in processor.list_files():
+        if os.path.exists(os.path.join(intervals_dir, filename)):
+            filenames.append(filename)
+        else:
+            logger.info("Скважина %s пропущена: нет разметки в %s", filename, intervals_dir)
+    if not filenames:
+        raise ValueError(f"В директории {data_dir} нет CSV-файлов с разметкой в {intervals_dir}")
+    configs = list(ParameterGrid(param_grid))
+    alive = list(range(len(configs)))
+    scores = defaultdict(dict)  # номер конфигурации -> {файл: F1-score}
+    excluded = {}  # файл -> ошибка
+
+    n_wells = min(len(filenames), min_wells) if halving else len(filenames)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            usable = [filename for filename in filenames if filename not in excluded]
+            wells = usable[:n_wells]
+            futures = {}
+            for filename in wells:
+                missing = [(i, configs[i]) for i in alive if filename not in scores[i]]
+                if missing:
+                    futures[executor.submit(_evaluate_well, processor, filename, missing)] = filename
+            for future in as_completed(futures):
+                try:
+                    filename, well_scores = future.result()
+                except Exception as exc:
+                    excluded[futures[future]] = f"{type(exc).__name__}: {exc}"
+                    logger.warning("Скважина %s исключена из подбора: %s", futures[future], excluded[futures[future]])
+                    continue
+                for index, score in well_scores:
+                    scores[index][filename] = score
+            if any(filename in excluded for filename in wells):
+                if len(excluded) == len(filenames):
+                    raise ValueError("Ни одна скважина не обработана: " + "; ".join(
+                        f"{filename}: {error}" for filename, error in excluded.items()))
+                continue  # этап повторяется со следующими скважинами вместо исключенных
+
+            mean_scores = {i: np.mean([scores[i][f] for f in wells]) for i in alive}
+            alive.sort(key=lambda i: mean_scores[i], reverse=True)
+            if len(wells) == len(usable):
+                break
+            # Отсекаем заведомо плохие конфигурации и увеличиваем число скважин
+            alive = alive[:max(1, math.ceil(len(alive) / eta))]
+            n_wells = min(len(usable), n_wells * eta)
+
+    best = alive[0]
+    return {
+        "best_params": configs[best],
+        "best_score": mean_scores[best],
+        "per_well": dict(sorted(scores[best].items())),
+        "results": [{"params": configs[i], "score": mean_scores[i]} for i in alive],
+        "excluded": excluded,
+    }
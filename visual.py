@@ -1,42 +1,54 @@
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from search import detect_patterns  # Импортируем функцию для обнаружения интервалов
+from series import WellSeries, as_series
 
-def plot_intervals(data, recovery_intervals, drop_intervals):
+def plot_intervals(data, recovery_intervals, drop_intervals, figure=None):
     """
     Визуализация временных рядов давления с выделенными интервалами КВД и КПД.
 
     Аргументы:
-      data: DataFrame с колонками "Время (часы)" и "Давление (атм)".
+      data: WellSeries или DataFrame с колонками "Время (часы)" и "Давление (атм)".
       recovery_intervals: Список интервалов для КВД, например, [[начало, конец], ...].
       drop_intervals: Список интервалов для КПД.
+      figure: Figure, на которой строится график; по умолчанию создается новая
+        (без pyplot, поэтому функцию можно вызывать из нескольких потоков).
+
+    Возвращает Figure с графиком (сохраняется через figure.savefig).
     """
-    plt.figure(figsize=(12, 6))
-    plt.plot(data["Время (часы)"], data["Давление (атм)"], label="Давление", color='blue')
+    series = as_series(data)
+    if figure is None:
+        figure = Figure(figsize=(12, 6))
+        FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    ax.plot(series.time, series.pressure, label="Давление", color='blue')
 
     # Отображение интервалов КВД
     for idx, interval in enumerate(recovery_intervals):
-        plt.axvspan(interval[0], interval[1], color='green', alpha=0.3, label="КВД" if idx == 0 else "")
+        ax.axvspan(interval[0], interval[1], color='green', alpha=0.3, label="КВД" if idx == 0 else "")
 
     # Отображение интервалов КПД
     for idx, interval in enumerate(drop_intervals):
-        plt.axvspan(interval[0], interval[1], color='red', alpha=0.3, label="КПД" if idx == 0 else "")
+        ax.axvspan(interval[0], interval[1], color='red', alpha=0.3, label="КПД" if idx == 0 else "")
 
     # Настройка графика
-    plt.xlabel("Время (часы)")
-    plt.ylabel("Давление (атм)")
-    plt.title("Выделение интервалов КВД и КПД")
-    plt.legend()
-    plt.grid()
-    plt.show()
+    ax.set_xlabel("Время (часы)")
+    ax.set_ylabel("Давление (атм)")
+    ax.set_title("Выделение интервалов КВД и КПД")
+    ax.legend()
+    ax.grid()
+    return figure
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt  # окно с графиком нужно только при запуске скрипта
+
     # Загрузка данных из well_data.csv
-    data = pd.read_csv("well_data.csv")
-    data.columns = ["Время (часы)", "Давление (атм)"]
+    data = WellSeries.from_frame(pd.read_csv("well_data.csv"))
 
     # Применение алгоритма для обнаружения интервалов
-    recovery_intervals, drop_intervals = detect_patterns(data)
+    recovery_intervals, drop_intervals, _ = detect_patterns(data)
 
     # Визуализация результатов
-    plot_intervals(data, recovery_intervals, drop_intervals)
\ No newline at end of file
+    plot_intervals(data, recovery_intervals, drop_intervals, plt.figure(figsize=(12, 6)))
+    plt.show()
\ No newline at end of file
@@ -0,0 +1,343 @@
+"""
+Служба, обрабатывающая новые и измененные CSV-файлы скважин в наблюдаемых папках.
+
+Об измененных файлах служба узнает из уведомлений файловой системы (watchdog:
+inotify, FSEvents, ReadDirectoryChangesW). Если watchdog не установлен или папки
+еще нет, при каждом опросе проверяется только время изменения папки, и папка
+перечитывается (os.scandir), лишь когда в ней появились, удалены или переименованы
+файлы. Кроме того, раз в WATCH_RESCAN секунд папки перечитываются целиком: так
+находятся файлы, перезаписанные на месте без уведомления. В остальное время stat
+вызывается только для измененных файлов, еще не признанных дописанными, поэтому
+стоимость опроса пропорциональна числу изменений, а не числу файлов в папках.
+
+Файл считается дописанным, когда его размер и время изменения не менялись между
+опросами и с последнего изменения прошло не меньше debounce секунд. Готовые файлы
+передаются в пул процессов: проверка ряда, detect_patterns по непрерывным участкам,
+диагностика каждой КВД по производной Бурде и, если в intervals_dir есть разметка
+с тем же именем, оценка F1. Результаты дописываются в output (JSON-строки) по мере
+готовности; по этому же файлу при перезапуске определяются уже обработанные версии.
+
+    python watch.py --dirs uploads data
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+import metrics
+from config import WATCH_DIRS, WATCH_INTERVAL, WATCH_DEBOUNCE, WATCH_RESCAN, WATCH_OUTPUT, WORKERS
+from data_processor import DataProcessor
+from f1score import calculate_f1_score
+from diagnostics import diagnose_recoveries
+from quality import validate_series, detect_segments
+
+logger = logging.getLogger("watch")
+
+
+def _intervals(intervals):
+    return [[float(start), float(end)] for start, end in intervals]
+
+
+def analyze_file(path, intervals_dir, detect_params={}):
+    """
+    Обнаруживает интервалы в файле path и оценивает их, если есть истинная разметка.
+    Выполняется в процессе пула; ошибка возвращается записью с ключом "error".
+    """
+    processor = DataProcessor(os.path.dirname(path), intervals_dir)
+    filename = os.path.basename(path)
+    result = {"path": path, "file": filename}
+    with metrics.capture() as records:
+        try:
+            data = processor.load_data(filename)
+            with metrics.stage("watch.detect", len(data)):
+                data, segments, result["quality"] = validate_series(data, detect_params.get("window_size", 10))
+                recovery_intervals, drop_intervals, _ = detect_segments(data, segments, **detect_params)
+            result["recovery"] = _intervals(recovery_intervals)
+            result["drop"] = _intervals(drop_intervals)
+            with metrics.stage("watch.diagnostics", len(data)):
+                result["diagnostics"] = diagnose_recoveries(data, recovery_intervals)
+            if os.path.exists(os.path.join(intervals_dir, filename)):
+                with metrics.stage("watch.score", len(data)):
+                    true_recovery, true_drop = processor.load_intervals(filename)
+                    result["f1_recovery"] = float(calculate_f1_score(true_recovery, recovery_intervals, data))
+                    result["f1_drop"] = float(calculate_f1_score(true_drop, drop_intervals, data))
+        except Exception as exc:
+            result["error"] = f"{type(exc).__name__}: {exc}"
+            result["traceback"] = traceback.format_exc()
+    result["metrics"] = records
+    return result
+
+
+class FolderWatcher:
+    """
+    Наблюдает за папками dirs и обрабатывает новые и измененные CSV-файлы в пуле процессов.
+
+    Одновременно в пуле находится не больше 2 * workers файлов; остальные готовые
+    файлы ждут следующего опроса. Если файл изменился во время обработки, новая
+    версия будет обработана после завершения текущей.
+
+    Если процесс пула завершился аварийно (например, убит при нехватке памяти), пул
+    создается заново, а все файлы, которые в нем находились, обрабатываются повторно
+    по одному: ошибка записывается только для файла, на котором пул снова падает.
+    """
+
+    def __init__(self, dirs=WATCH_DIRS, intervals_dir="true_intervals", output=WATCH_OUTPUT,
+                 detect_params={}, workers=WORKERS, debounce=WATCH_DEBOUNCE, interval=WATCH_INTERVAL,
+                 rescan=WATCH_RESCAN, notify=True):
+        self.dirs = list(dirs)
+        self.intervals_dir = intervals_dir
+        self.output = output
+        self.detect_params = detect_params
+        self.workers = workers or os.cpu_count() or 1
+        self.debounce = debounce
+        self.interval = interval
+        self.rescan = rescan
+        self.notify = notify
+        self._seen = {}  # путь -> (размер, время изменения) на прошлом опросе, для еще не готовых файлов
+        self._changed = set()  # пути из уведомлений с прошлого опроса
+        self._changed_lock = threading.Lock()
+        self._observed = set()  # папки, об изменениях в которых приходят уведомления
+        self._dir_mtimes = {}  # папка -> время изменения при последнем чтении
+        self._last_rescan = None
+        self._done = self._load_done()  # путь -> обработанная версия (размер, время изменения)
+        self._running = {}  # future -> (путь, версия)
+        self._suspects = []  # (путь, версия) файлов, бывших в пуле при его аварийном завершении
+        self._executor = None
+        self._stop = threading.Event()
+
+    def _load_done(self):
+        done = {}
+        if os.path.exists(self.output):
+            with open(self.output, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # недописанная строка после сбоя
+                    if "error" not in entry:
+                        done[entry["path"]] = (entry["size"], entry["mtime_ns"])
+        return done
+
+    def scan(self, now=None):
+        """
+        Проверяет измененные файлы и возвращает список (путь, версия) файлов, готовых к обработке.
+        """
+        now = time.time() if now is None else now
+        for path in self._collect_changes(now):
+            self._seen.setdefault(path, None)
+        in_flight = {path for path, _ in self._running.values()}
+        ready = []
+        for path, previous in list(self._seen.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self._seen[path]
+                continue
+            version = (stat.st_size, stat.st_mtime_ns)
+            if self._done.get(path) == version:
+                del self._seen[path]
+                continue
+            self._seen[path] = version
+            if previous == version and now - stat.st_mtime_ns / 1e9 >= self.debounce and path not in in_flight:
+                # Файл в обработке остается в _seen: его новая версия будет готова после завершения
+                del self._seen[path]
+                ready.append((path, version))
+        return ready
+
+    def _collect_changes(self, now):
+        """
+        Пути CSV-файлов, которые могли измениться с прошлого опроса: из уведомлений,
+        из папок, время изменения которых поменялось, и из всех папок при полном опросе.
+        """
+        with self._changed_lock:
+            changed, self._changed = self._changed, set()
+        full = self._last_rescan is None or now - self._last_rescan >= self.rescan
+        if full:
+            self._last_rescan = now
+        for directory in self.dirs:
+            if not full and directory in self._observed:
+                continue
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if full or self._dir_mtimes.get(directory) != mtime:
+                self._dir_mtimes[directory] = mtime
+                changed.update(self._list_csv(directory))
+        return changed
+
+    @staticmethod
+    def _list_csv(directory):
+        try:
+            with os.scandir(directory) as entries:
+                return [entry.path for entry in entries if entry.name.endswith(".csv") and entry.is_file()]
+        except FileNotFoundError:
+            return []
+
+    def _notified(self, *paths):
+        with self._changed_lock:
+            self._changed.update(path for path in paths if path and path.endswith(".csv"))
+
+    def _start_observer(self):
+        """
+        Подписывается на уведомления об изменениях в существующих папках (если установлен
+        watchdog). Остальные папки опрашиваются по времени изменения.
+        """
+        if not self.notify or importlib.util.find_spec("watchdog") is None:
+            logger.info("Уведомления файловой системы недоступны, папки опрашиваются по времени изменения")
+            return None
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if not event.is_directory and event.event_type in ("created", "modified", "moved", "closed"):
+                    watcher._notified(event.src_path, event.dest_path)
+
+        observer = Observer()
+        for directory in self.dirs:
+            if os.path.isdir(directory):
+                observer.schedule(Handler(), directory, recursive=False)
+                self._observed.add(directory)
+        observer.daemon = True
+        observer.start()
+        return observer
+
+    def step(self, out):
+        """
+        Один цикл: опрос папок, постановка готовых файлов в пул и запись завершенных результатов.
+        """
+        if self._suspects:
+            # После аварийного завершения пула файлы проверяются по одному, чтобы найти виновный
+            if not self._running:
+                self._submit(*self._suspects.pop(0))
+        else:
+            ready = self.scan()
+            capacity = max(0, 2 * self.workers - len(self._running))
+            for path, version in ready[:capacity]:
+                self._submit(path, version)
+            for path, version in ready[capacity:]:
+                self._seen[path] = version  # готов, ждет места в пуле
+        if self._running:
+            finished, _ = wait(list(self._running), timeout=self.interval, return_when=FIRST_COMPLETED)
+        else:
+            finished = ()
+            self._stop.wait(self.interval)
+        for future in finished:
+            if future in self._running:  # уже снята, если пул завершился аварийно
+                self._record(future, out)
+
+    def _submit(self, path, version):
+        try:
+            future = self._executor.submit(analyze_file, path, self.intervals_dir, self.detect_params)
+        except BrokenProcessPool:
+            # Пул сломан, но завершение его задач еще не обработано
+            self._restart_pool()
+            future = self._executor.submit(analyze_file, path, self.intervals_dir, self.detect_params)
+        self._running[future] = (path, version)
+        logger.info("Обработка %s", path)
+
+    def _restart_pool(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def _pool_broken(self, out):
+        """
+        Пул завершился аварийно: все его файлы снимаются и ставятся на повторную обработку
+        по одному. Если в пуле был один файл, виновный известен — для него пишется ошибка.
+        """
+        running = list(self._running.values())
+        self._running.clear()
+        self._restart_pool()
+        if len(running) == 1:
+            path, version = running[0]
+            self._write(path, version, {"path": path, "file": os.path.basename(path),
+                                        "error": "BrokenProcessPool: процесс обработки файла завершился аварийно"}, out)
+        else:
+            logger.warning("Процесс пула завершился аварийно, %d файлов будут обработаны повторно по одному",
+                           len(running))
+            self._suspects.extend(running)
+
+    def _record(self, future, out):
+        path, version = self._running[future]
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            self._pool_broken(out)
+            return
+        except Exception as exc:
+            result = {"path": path, "file": os.path.basename(path), "error": f"{type(exc).__name__}: {exc}"}
+        del self._running[future]
+        self._write(path, version, result, out)
+
+    def _write(self, path, version, result, out):
+        metrics.merge(result.pop("metrics", None))
+        result.update(size=version[0], mtime_ns=version[1], finished=time.time())
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+        # Версия с ошибкой (в том числе файл, на котором падает процесс пула) повторно
+        # не обрабатывается до изменения файла или перезапуска службы
+        self._done[path] = version
+        if "error" in result:
+            logger.warning("Файл %s: ошибка %s", path, result["error"])
+        else:
+            logger.info("Готово %s: КВД %d, КПД %d", path, len(result["recovery"]), len(result["drop"]))
+
+    def run(self):
+        """
+        Работает до вызова stop() (или прерывания); незавершенные файлы дорабатываются перед выходом.
+        """
+        self._restart_pool()
+        observer = self._start_observer()
+        with open(self.output, "a", encoding="utf-8") as out:
+            try:
+                while not self._stop.is_set():
+                    self.step(out)
+            finally:
+                # Файлы, ожидающие повторной обработки, будут обработаны после перезапуска
+                while self._running:
+                    future = next(iter(self._running))
+                    future.exception()  # ждем завершения
+                    self._record(future, out)
+                self._suspects.clear()
+                self._executor.shutdown()
+                if observer is not None:
+                    observer.stop()
+                    observer.join()
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обработка новых файлов скважин в наблюдаемых папках")
+    parser.add_argument("--dirs", nargs="+", default=list(WATCH_DIRS))
+    parser.add_argument("--intervals-dir", default="true_intervals")
+    parser.add_argument("--output", default=WATCH_OUTPUT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE)
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL)
+    parser.add_argument("--rescan", type=float, default=WATCH_RESCAN, help="период полного опроса папок, секунд")
+    parser.add_argument("--poll", action="store_true", help="не использовать уведомления файловой системы")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    watcher = FolderWatcher(args.dirs, args.intervals_dir, args.output, workers=args.workers,
+                            debounce=args.debounce, interval=args.interval, rescan=args.rescan, notify=not args.poll)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    metrics.log_summary()
+
+
+if __name__ == "__main__":
+    main()